@@ -4,37 +4,34 @@ import os
 import markdown
 import asyncio
 from typing import Dict, Optional, List, Any
-from fastapi import FastAPI, BackgroundTasks, HTTPException, APIRouter, Depends, Request, Body
+from fastapi import FastAPI, BackgroundTasks, HTTPException, APIRouter, Depends, Request, Body, WebSocket, WebSocketDisconnect, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from pathlib import Path
 from sqlmodel import Session, select
-from datetime import datetime
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi.responses import HTMLResponse
 
 # Internal package imports
-from .main import run, stream_run
+from .main import run
 from .services.logging_service import logger
 from .database import create_db_and_tables, get_session
 from .routers import auth, payment, support, admin, publish
-from .dependencies import get_current_user
+from .dependencies import get_current_user, user_from_token
 from .schemas.db_models import User, Blog
 from .schemas.models import Plan, EvidenceItem
-from .utils.slug import slugify
 from .migrate import run_migrations
+from .services.llm_service import llm_manager
+from .services.stream_service import stream_manager, encode_json, STREAM_WS_OUTBOX_SIZE
+from .services.search_service import get_search_provider
+from .worker import job_worker, JOB_EMBEDDED_WORKER
 
 # --- Security & Rate Limiting ---
 limiter = Limiter(key_func=get_remote_address)
-generation_semaphore = asyncio.Semaphore(2)
-
-# Global task tracker to allow cancellation
-# Maps job_id -> asyncio.Task
-running_tasks: Dict[str, asyncio.Task] = {}
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -80,58 +77,6 @@ static_dir.mkdir(parents=True, exist_ok=True)
 (static_dir / "blogs").mkdir(parents=True, exist_ok=True)
 app.mount("/static", CORSStaticFiles(directory="outputs"), name="static")
 
-# --- STREAM MANAGER ---
-class StreamManager:
-    def __init__(self):
-        self.queues: Dict[str, asyncio.Queue] = {}
-
-    def create(self, job_id: str):
-        self.queues[job_id] = asyncio.Queue()
-
-    def _make_serializable(self, obj):
-        """Recursively convert Pydantic models or other non-serializable objects to dicts."""
-        if hasattr(obj, "model_dump"):
-            return obj.model_dump()
-        if isinstance(obj, list):
-            return [self._make_serializable(item) for item in obj]
-        if isinstance(obj, dict):
-            return {k: self._make_serializable(v) for k, v in obj.items()}
-        return obj
-
-    async def push(self, job_id: str, event: str, data: Any):
-        if job_id in self.queues:
-            serializable_data = self._make_serializable(data)
-            await self.queues[job_id].put({"event": event, "data": serializable_data})
-
-    async def generator(self, job_id: str):
-        q = self.queues.get(job_id)
-        if not q:
-            logger.error(f"Worker {os.getpid()} - No queue found for job {job_id}. This request likely hit the wrong Gunicorn worker.")
-            yield f"event: error\ndata: {json.dumps({'message': 'Stream queue not found on this worker'})}\n\n"
-            return
-            
-        logger.info(f"Worker {os.getpid()} - Starting stream for job {job_id}")
-        try:
-            while True:
-                try:
-                    # Wait for message with a timeout to send heartbeats
-                    msg = await asyncio.wait_for(q.get(), timeout=15.0)
-                    
-                    if msg["event"] == "end":
-                        yield f"event: end\ndata: {json.dumps(msg['data'])}\n\n"
-                        break
-                        
-                    yield f"event: {msg['event']}\ndata: {json.dumps(msg['data'])}\n\n"
-                except asyncio.TimeoutError:
-                    # Send heartbeat to keep connection alive and bypass proxy buffering
-                    yield f"event: ping\ndata: {json.dumps({'time': datetime.utcnow().isoformat()})}\n\n"
-                    
-        except asyncio.CancelledError:
-            logger.info(f"Worker {os.getpid()} - Client disconnected from stream {job_id}")
-        finally:
-            self.queues.pop(job_id, None)
-
-stream_manager = StreamManager()
 
 # --- Pydantic Models ---
 
@@ -158,142 +103,6 @@ class JobStatusResponse(BaseModel):
     thoughts: List[str] = Field(default_factory=list)
     intermediate_content: Optional[str] = ""
 
-# --- Background Task ---
-
-async def generate_blog_task_streaming(job_id: str, topic: str, tone: str):
-    """Background worker that pushes updates to the StreamManager and persists progress to DB."""
-    async with generation_semaphore:
-        logger.info(f"Worker {os.getpid()} - Streaming task started for Job ID: {job_id}")
-        
-        # 1. Update DB to Processing
-        with next(get_session()) as session:
-            db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
-            if db_blog:
-                db_blog.status = "processing"
-                db_blog.thoughts_json = "[]"
-                db_blog.intermediate_content = ""
-                session.add(db_blog)
-                session.commit()
-
-        try:
-            final_output = {}
-            current_thoughts = []
-            current_md = ""
-            
-            # 2. Run the Streaming Workflow
-            async for event_type, event_data in stream_run(topic, tone=tone):
-                # CHECK FOR CANCELLATION (Database-driven for multi-worker support)
-                if event_type == "thought": # Check on every log/thought event
-                    # Persist thoughts to DB for polling fallback
-                    current_thoughts.append(event_data)
-                    with next(get_session()) as session:
-                        db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
-                        if db_blog:
-                            if db_blog.status == "abandoned":
-                                logger.warning(f"Worker {os.getpid()} - Detected ABANDONED status for {job_id}. Terminating.")
-                                return
-                            db_blog.thoughts_json = json.dumps(current_thoughts)
-                            session.add(db_blog)
-                            session.commit()
-
-                # Push to SSE stream
-                await stream_manager.push(job_id, event_type, event_data)
-                
-                # Accumulate state data as it arrives
-                if event_type in ["plan", "evidence", "image_specs", "seo"]:
-                    final_output[event_type] = event_data
-                elif event_type == "content":
-                    current_md = event_data
-                    with next(get_session()) as session:
-                        db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
-                        if db_blog:
-                            db_blog.intermediate_content = current_md
-                            session.add(db_blog)
-                            session.commit()
-                elif event_type == "complete":
-                    final_output.update(event_data)
-                    # Once complete is yielded, we can stop the loop
-                    break
-
-            # 3. Process Result (Persistence)
-            if final_output.get("plan") or final_output.get("final"):
-                plan = final_output.get("plan")
-                evidence = final_output.get("evidence", [])
-                image_specs = final_output.get("image_specs", [])
-                seo_data = final_output.get("seo", {})
-                
-                raw_title = "Unknown Title"
-                if plan:
-                    raw_title = plan.blog_title if hasattr(plan, "blog_title") else plan.get("blog_title", "Unknown Title")
-                
-                safe_name = slugify(raw_title)
-                download_url = f"/static/blogs/{safe_name}.md"
-                image_urls = [f"/static/images/{spec['filename']}" for spec in image_specs]
-
-                # Serialization logic
-                plan_dict = plan.model_dump() if hasattr(plan, "model_dump") else plan
-                evidence_list = []
-                for e in evidence:
-                    if hasattr(e, "model_dump"): evidence_list.append(e.model_dump())
-                    elif isinstance(e, dict): evidence_list.append(e)
-                    else: evidence_list.append(str(e))
-
-                with next(get_session()) as session:
-                    db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
-                    if db_blog:
-                        # Final check: Don't mark as completed if it was abandoned while we were processing the results
-                        if db_blog.status == "abandoned":
-                            logger.warning(f"Job {job_id} was abandoned at the very end. Skipping completion.")
-                            return
-
-                        db_blog.status = "completed"
-                        db_blog.title = raw_title
-                        db_blog.download_url = download_url
-                        db_blog.plan_json = json.dumps(plan_dict) if plan_dict else db_blog.plan_json
-                        db_blog.evidence_json = json.dumps(evidence_list) if evidence_list else db_blog.evidence_json
-                        db_blog.images_json = json.dumps(image_urls) if image_urls else db_blog.images_json
-                        db_blog.meta_description = seo_data.get("meta_description") if seo_data else db_blog.meta_description
-                        db_blog.keywords = seo_data.get("keywords") if seo_data else db_blog.keywords
-                        db_blog.thoughts_json = json.dumps(current_thoughts)
-                        db_blog.updated_at = datetime.utcnow()
-                        session.add(db_blog)
-                        session.commit()
-                
-                await stream_manager.push(job_id, "end", {"status": "completed"})
-            else:
-                with next(get_session()) as session:
-                    db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
-                    if db_blog and db_blog.status == "completed":
-                        await stream_manager.push(job_id, "end", {"status": "completed"})
-                        return
-                raise Exception("Workflow finished but returned no output.")
-        except asyncio.CancelledError:
-            logger.warning(f"Worker {os.getpid()} - Job {job_id} was CANCELLED mid-execution. Refunding credit.")
-            with next(get_session()) as session:
-                db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
-                if db_blog:
-                    db_user = session.get(User, db_blog.user_id)
-                    db_blog.status = "abandoned"
-                    if db_user:
-                        db_user.credits_left += 1 # REFUND
-                        session.add(db_user)
-                    session.add(db_blog)
-                    session.commit()
-            await stream_manager.push(job_id, "end", {"status": "cancelled"})
-        except Exception as e:
-            logger.error(f"Error in streaming job {job_id}: {str(e)}", exc_info=True)
-            with next(get_session()) as session:
-                db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
-                if db_blog:
-                    db_blog.status = "failed"
-                    db_blog.error = str(e)
-                    session.add(db_blog)
-                    session.commit()
-            await stream_manager.push(job_id, "error", str(e))
-            await stream_manager.push(job_id, "end", {"status": "failed"})
-        finally:
-            running_tasks.pop(job_id, None)
-
 # --- API Router Setup ---
 
 import sys
@@ -314,6 +123,12 @@ def on_startup():
         logger.error(f"CRITICAL: Missing required environment variables: {', '.join(missing)}")
         sys.exit(1)
 
+    try:
+        get_search_provider()
+    except (ValueError, OSError) as e:
+        logger.error(f"CRITICAL: Search provider is misconfigured: {e}")
+        sys.exit(1)
+
     # Note: os.chmod removed for security
     create_db_and_tables()
     
@@ -323,6 +138,22 @@ def on_startup():
     except Exception as e:
         logger.error(f"Schema migration failed during startup: {e}")
 
+@app.on_event("startup")
+async def start_job_worker():
+    # Generation runs in job workers; this process contributes one unless dedicated workers handle the queue
+    if JOB_EMBEDDED_WORKER:
+        app.state.job_worker_task = asyncio.create_task(job_worker.run())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Hand this process's running jobs back to the queue
+    if JOB_EMBEDDED_WORKER:
+        await job_worker.stop()
+        await app.state.job_worker_task
+    # Release pooled keep-alive connections to the LLM provider
+    await llm_manager.aclose()
+    await stream_manager.aclose()
+
 api_router = APIRouter(prefix="/api/v1")
 api_router.include_router(auth.router)
 api_router.include_router(payment.router)
@@ -331,13 +162,14 @@ api_router.include_router(admin.router)
 api_router.include_router(publish.router)
 
 @api_router.get("/stream/{job_id}")
-async def stream_job_events(job_id: str):
+async def stream_job_events(job_id: str, request: Request):
     """
     SSE Endpoint for real-time updates.
+    Reconnects that send Last-Event-ID get the missed events replayed.
     Includes headers to prevent Nginx/Reverse Proxy buffering.
     """
     return StreamingResponse(
-        stream_manager.generator(job_id),
+        stream_manager.generator(job_id, request.headers.get("last-event-id")),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -346,6 +178,89 @@ async def stream_job_events(job_id: str):
         }
     )
 
+@api_router.websocket("/ws/jobs")
+async def watch_jobs(websocket: WebSocket, token: str = Query(...)):
+    """
+    One WebSocket for all of a user's jobs. The user's queued/processing jobs are subscribed on connect;
+    clients send {"action": "subscribe", "job_id": ..., "last_event_id": ...} or {"action": "unsubscribe", "job_id": ...}.
+    Every message is {"job_id", "id", "event", "data"} with the same events and ids as the SSE stream.
+    """
+    with next(get_session()) as session:
+        try:
+            user = user_from_token(token, session)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        active_jobs = session.exec(
+            select(Blog.job_id).where(Blog.user_id == user.id, Blog.status.in_(["queued", "processing"]))
+        ).all()
+    await websocket.accept()
+
+    # Job forwarders only queue messages; a single sender owns the socket
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=STREAM_WS_OUTBOX_SIZE)
+    watchers: Dict[str, asyncio.Task] = {}
+
+    async def forward(job_id: str, last_event_id: Optional[str]):
+        try:
+            async for frame in stream_manager.events(job_id, last_event_id):
+                if frame.event != "ping":  # the WebSocket keeps itself alive
+                    await outbox.put(frame.envelope(job_id))
+        except Exception as e:
+            # Tell the client this job's updates stopped instead of going silent
+            logger.error(f"Worker {os.getpid()} - WebSocket stream for job {job_id} failed: {e}", exc_info=True)
+            await send_error(job_id, "Stream failed")
+        finally:
+            if watchers.get(job_id) is asyncio.current_task():
+                del watchers[job_id]
+
+    def subscribe(job_id: str, last_event_id: Optional[str] = None):
+        if job_id in watchers:
+            watchers[job_id].cancel()
+        watchers[job_id] = asyncio.create_task(forward(job_id, last_event_id))
+
+    async def send_error(job_id: Optional[str], message: str):
+        await outbox.put(encode_json({"job_id": job_id, "id": None, "event": "error", "data": {"message": message}}).decode("utf-8"))
+
+    async def send_loop():
+        while True:
+            await websocket.send_text(await outbox.get())
+
+    sender = asyncio.create_task(send_loop())
+    for job_id in active_jobs:
+        subscribe(job_id)
+    logger.info(f"Worker {os.getpid()} - WebSocket opened for user {user.id} ({len(active_jobs)} active jobs)")
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except (ValueError, KeyError):
+                # KeyError: a binary frame has no text to decode
+                await send_error(None, "Messages must be JSON text")
+                continue
+            action = message.get("action") if isinstance(message, dict) else None
+            job_id = message.get("job_id") if isinstance(message, dict) else None
+            if action not in ("subscribe", "unsubscribe") or not isinstance(job_id, str):
+                await send_error(job_id if isinstance(job_id, str) else None, "Expected {action: subscribe|unsubscribe, job_id}")
+            elif action == "unsubscribe":
+                task = watchers.pop(job_id, None)
+                if task:
+                    task.cancel()
+            else:
+                with next(get_session()) as session:
+                    db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
+                last_event_id = message.get("last_event_id")
+                if not db_blog or (db_blog.user_id != user.id and not user.is_admin):
+                    await send_error(job_id, "Job not found")
+                elif last_event_id is not None and not stream_manager.valid_event_id(last_event_id):
+                    await send_error(job_id, "last_event_id is not an event id from this stream")
+                else:
+                    subscribe(job_id, last_event_id)
+    except WebSocketDisconnect:
+        logger.info(f"Worker {os.getpid()} - WebSocket closed for user {user.id}")
+    finally:
+        for task in [sender, *watchers.values()]:
+            task.cancel()
+
 @api_router.post("/cancel/{job_id}")
 async def cancel_job(
     job_id: str,
@@ -358,6 +273,7 @@ async def cancel_job(
         raise HTTPException(status_code=404, detail="Job not found")
 
     # 1. Update Database IMMEDIATELY (This is the Global Stop Signal)
+    was_queued = db_blog.status == "queued"
     if db_blog.status in ["queued", "processing"]:
         db_blog.status = "abandoned"
         db_user = session.get(User, current_user.id)
@@ -367,10 +283,13 @@ async def cancel_job(
         session.add(db_blog)
         session.commit()
         logger.warning(f"Global cancellation signal (abandoned status) set for job {job_id}")
+    if was_queued:
+        # No worker runs it to push the final event; close the stream its viewers are waiting on
+        await stream_manager.push(job_id, "end", {"status": "cancelled"})
 
     # 2. Local Task Cancellation (Immediate if on the same worker)
-    if job_id in running_tasks:
-        running_tasks[job_id].cancel()
+    if job_id in job_worker.running:
+        job_worker.running[job_id].cancel()
         return {"status": "cancelled", "message": "Task termination signal sent locally and status marked globally."}
     
     return {"status": "cancelled", "message": "Job marked as abandoned globally. Background worker will stop shortly."}
@@ -390,8 +309,9 @@ async def create_blog_job(
     job_id = str(uuid.uuid4())
     logger.info(f"--- API REQUEST --- User ID: {current_user.id} | Topic: {blog_req.topic} | Tone: {blog_req.tone}")
     
-    # Create the Queue for this job
-    stream_manager.create(job_id)
+    # Open the event stream for this job so clients can connect before a worker claims it
+    # (shared across workers when a Redis broker is configured)
+    await stream_manager.announce(job_id)
     
     new_blog = Blog(
         job_id=job_id, 
@@ -408,9 +328,9 @@ async def create_blog_job(
     session.add(db_user)
     session.commit()
     
-    # Use asyncio.create_task instead of background_tasks to allow tracking/cancellation
-    task = asyncio.create_task(generate_blog_task_streaming(job_id, blog_req.topic, blog_req.tone))
-    running_tasks[job_id] = task
+    # The committed "queued" row is the queue entry; a job worker claims and runs it
+    if JOB_EMBEDDED_WORKER:
+        job_worker.notify()
     
     return {"job_id": job_id}
 
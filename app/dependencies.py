@@ -8,6 +8,10 @@ from .schemas.db_models import User
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+    return user_from_token(token, session)
+
+def user_from_token(token: str, session: Session) -> User:
+    """Resolves a bearer token to an active user; also used where no Authorization header exists (WebSockets)."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
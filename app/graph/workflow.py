@@ -1,55 +1,119 @@
+import threading
 from langgraph.graph import START, END, StateGraph
-from ..schemas.models import State
+from ..schemas.models import State, WritingOutput, VisualsOutput
 from ..nodes.router import RouterNode, route_next
 from ..nodes.researcher import ResearcherNode
 from ..nodes.orchestrator import OrchestratorNode, fanout
 from ..nodes.worker import WorkerNode
 from ..nodes.reducer import ReducerNode, ImageWorkerNode
+from ..services.llm_service import get_node_llm, node_models
+from ..services.metrics_service import timed_node
+from ..services.logging_service import logger
 
-def create_workflow():
-    # Initialize nodes
-    router = RouterNode()
-    researcher = ResearcherNode()
-    orchestrator = OrchestratorNode()
-    worker = WorkerNode()
-    reducer = ReducerNode()
+# Process-wide registry of compiled graphs, keyed by workflow options and the per-node model config.
+# Compiled graphs hold no per-job state (no checkpointer), so concurrent jobs can share them.
+# Other settings come from environment variables read once at import, so they cannot go stale.
+_compiled_workflows = {}
+_registry_lock = threading.Lock()
+
+def _subgraph_node(subgraph):
+    """
+    Runs a compiled subgraph from a node so only its output_schema keys reach the parent.
+    Sibling subgraphs added directly as nodes would both write back shared keys (e.g. topic).
+    """
+    async def run(state: State, config):
+        return await subgraph.ainvoke(state, config)
+    return run
+
+def create_workflow(**options):
+    """
+    Builds and compiles a fresh workflow graph. Prefer get_workflow() on the request path.
+    Options: research_mode ("synthesize" | "fast", defaults to RESEARCH_MODE).
+    """
+    # Initialize nodes with their configured model tiers
+    router = RouterNode(llm=get_node_llm("router"))
+    researcher = ResearcherNode(llm=get_node_llm("research"), mode=options.get("research_mode"))
+    orchestrator = OrchestratorNode(llm=get_node_llm("orchestrator"))
+    worker = WorkerNode(llm=get_node_llm("worker"))
+    reducer = ReducerNode(llm=get_node_llm("decide_images"), seo_llm=get_node_llm("seo"))
     image_worker = ImageWorkerNode()
 
-    # --- Reducer Subgraph (Optimized with Fanout) ---
-    reducer_graph = StateGraph(State)
-    reducer_graph.add_node("merge_content", reducer.merge_content)
-    reducer_graph.add_node("decide_images", reducer.decide_images)
-    reducer_graph.add_node("image_worker", image_worker)
-    reducer_graph.add_node("finalize_blog", reducer.finalize_blog)
-
-    reducer_graph.add_edge(START, "merge_content")
-    reducer_graph.add_edge("merge_content", "decide_images")
-    
-    # Fanout Images: decide_images -> image_worker (multiple) -> finalize_blog
-    reducer_graph.add_conditional_edges(
-        "decide_images", 
-        reducer.fanout_images, 
-        ["image_worker", "finalize_blog"]
-    )
-    reducer_graph.add_edge("image_worker", "finalize_blog")
-    reducer_graph.add_edge("finalize_blog", END)
-    
-    reducer_subgraph = reducer_graph.compile()
+    # Writing and visuals only depend on the plan, so they run as two sibling subgraphs.
+    # Each subgraph is a single task in the parent step, letting its internal fan-outs
+    # proceed independently instead of waiting on each other's step barriers.
+
+    # --- Writing Subgraph: worker (multiple) -> merge_content -> generate_seo ---
+    # SEO only needs the merged text, so it runs while the visuals branch is still generating images
+    writing_graph = StateGraph(State, output_schema=WritingOutput)
+    writing_graph.add_node("worker", timed_node("worker", worker))
+    writing_graph.add_node("merge_content", reducer.merge_content)
+    writing_graph.add_node("generate_seo", timed_node("seo", reducer.generate_seo))
+
+    writing_graph.add_conditional_edges(START, fanout, ["worker"])
+    writing_graph.add_edge("worker", "merge_content")
+    writing_graph.add_edge("merge_content", "generate_seo")
+    writing_graph.add_edge("generate_seo", END)
+
+    writing_subgraph = writing_graph.compile()
+
+    # --- Visuals Subgraph: decide_images -> image_worker (multiple) ---
+    visuals_graph = StateGraph(State, output_schema=VisualsOutput)
+    visuals_graph.add_node("decide_images", timed_node("decide_images", reducer.decide_images))
+    visuals_graph.add_node("image_worker", timed_node("image_worker", image_worker))
+
+    visuals_graph.add_edge(START, "decide_images")
+    visuals_graph.add_conditional_edges("decide_images", reducer.fanout_images, ["image_worker", END])
+    visuals_graph.add_edge("image_worker", END)
+
+    visuals_subgraph = visuals_graph.compile()
 
     # --- Main Graph ---
     graph = StateGraph(State)
-    graph.add_node("router", router)
-    graph.add_node("research", researcher)
-    graph.add_node("orchestrator", orchestrator)
-    graph.add_node("worker", worker)
-    graph.add_node("reducer", reducer_subgraph)
+    graph.add_node("router", timed_node("router", router))
+    graph.add_node("research", timed_node("research", researcher))
+    graph.add_node("orchestrator", timed_node("orchestrator", orchestrator))
+    graph.add_node("writing", _subgraph_node(writing_subgraph))
+    graph.add_node("visuals", _subgraph_node(visuals_subgraph))
+    graph.add_node("finalize_blog", reducer.finalize_blog)
 
     graph.add_edge(START, "router")
     graph.add_conditional_edges("router", route_next, {"research": "research", "orchestrator": "orchestrator"})
     graph.add_edge("research", "orchestrator")
 
-    graph.add_conditional_edges("orchestrator", fanout, ["worker"])
-    graph.add_edge("worker", "reducer")
-    graph.add_edge("reducer", END)
+    # Fan out both branches from the plan and join them at finalize_blog
+    graph.add_edge("orchestrator", "writing")
+    graph.add_edge("orchestrator", "visuals")
+    graph.add_edge(["writing", "visuals"], "finalize_blog")
+    graph.add_edge("finalize_blog", END)
 
     return graph.compile()
+
+def _registry_key(options: dict) -> tuple:
+    # Nodes get their LLM clients at compile time, so a reloaded per-node config needs a new graph
+    models = tuple(sorted((node, tuple(sorted(cfg.items()))) for node, cfg in node_models.items()))
+    return tuple(sorted(options.items())), models
+
+def get_workflow(**options):
+    """
+    Returns the compiled workflow for the given options and the current per-node model config,
+    building it only once per process. Jobs should use this instead of create_workflow() to skip
+    graph and client setup.
+    """
+    key = _registry_key(options)
+    app = _compiled_workflows.get(key)
+    if app is not None:
+        return app
+
+    with _registry_lock:
+        # Another thread may have compiled it while we waited for the lock
+        app = _compiled_workflows.get(key)
+        if app is None:
+            logger.info(f"Compiling workflow for options: {options or 'default'}")
+            app = create_workflow(**options)
+            _compiled_workflows[key] = app
+    return app
+
+def clear_workflow_cache():
+    """Drops all compiled workflows so the next job rebuilds them (e.g. after a config reload)."""
+    with _registry_lock:
+        _compiled_workflows.clear()
@@ -1,10 +1,14 @@
 import asyncio
 import os
 import json
-from .graph.workflow import create_workflow
+import time
+from .graph.workflow import get_workflow
+from .nodes.reducer import OrderedSectionMerger
+from .nodes.researcher import RESEARCH_MODE
 from .services.logging_service import logger
+from .services.metrics_service import node_latency
 
-async def run(topic: str, tone: str = "Professional"):
+async def run(topic: str, tone: str = "Professional", research_mode: str = None):
     """
     Main entry point for the Blog Generation Agent.
     Runs the workflow exactly ONCE and extracts full state.
@@ -13,7 +17,7 @@ async def run(topic: str, tone: str = "Professional"):
     logger.info("       BLOG WRITER - STARTING WORKFLOW        ")
     logger.info("==================================================")
     
-    app = create_workflow()
+    app = get_workflow(research_mode=research_mode or RESEARCH_MODE)
     
     initial_state = {
         "topic": topic,
@@ -49,12 +53,12 @@ async def run(topic: str, tone: str = "Professional"):
         logger.error(f"Workflow execution failed: {e}", exc_info=True)
         raise e
 
-async def stream_run(topic: str, tone: str = "Professional"):
+async def stream_run(topic: str, tone: str = "Professional", research_mode: str = None):
     """
     Generator that yields real-time updates from the workflow.
     Yields tuples of (event_type, event_data)
     """
-    app = create_workflow()
+    app = get_workflow(research_mode=research_mode or RESEARCH_MODE)
     
     initial_state = {
         "topic": topic,
@@ -64,6 +68,10 @@ async def stream_run(topic: str, tone: str = "Professional"):
         "image_results": [],
         "user_tone": tone 
     }
+    started = time.perf_counter()
+    first_content_seen = False
+    merger = None
+    last_draft = None
     
     # We iterate over the stream of events
     async for event in app.astream_events(initial_state, version="v2"):
@@ -71,8 +79,15 @@ async def stream_run(topic: str, tone: str = "Professional"):
         name = event["name"]
         data = event["data"]
         
+        # 0. Token-level section drafts from writer agents
+        if kind == "on_custom_event" and name == "section_delta":
+            if not first_content_seen:
+                first_content_seen = True
+                node_latency.record("time_to_first_content", time.perf_counter() - started)
+            yield ("section_delta", data)
+
         # 1. Real Thought Process
-        if kind == "on_tool_start":
+        elif kind == "on_tool_start":
             tool_input = data.get("input", "")
             if name == "tavily_search_results_json":
                 yield ("thought", f"Searching the web for: {tool_input}")
@@ -88,12 +103,14 @@ async def stream_run(topic: str, tone: str = "Professional"):
                 yield ("thought", "Writer agent is drafting a section...")
             elif name == "merge_content":
                 yield ("thought", "Merging all drafted sections into a unified draft...")
+            elif name == "generate_seo":
+                yield ("thought", "SEO strategist is writing the meta description and keywords...")
             elif name == "decide_images":
                 yield ("thought", "Visual Strategist is deciding on image placements...")
             elif name == "image_worker":
                 yield ("thought", "Generating custom visual assets...")
             elif name == "finalize_blog":
-                yield ("thought", "Finalizing blog, integrating images, and optimizing SEO...")
+                yield ("thought", "Finalizing blog and integrating images...")
         
         # 2. Progress & Granular Data Yielding
         elif kind == "on_chain_end":
@@ -105,21 +122,34 @@ async def stream_run(topic: str, tone: str = "Professional"):
 
                 # Capture and yield granular state updates as they happen
                 if name == "orchestrator" and "plan" in output:
+                    merger = OrderedSectionMerger(output["plan"])
                     yield ("plan", output["plan"])
                 elif name == "research" and "evidence" in output:
                     yield ("evidence", output["evidence"])
+                elif name == "generate_seo" and "seo" in output:
+                    yield ("seo", output["seo"])
                 elif name == "decide_images" and "image_specs" in output:
                     yield ("image_specs", output["image_specs"])
                 elif name == "worker":
                     yield ("thought", "Section completed and added to draft.")
+                    # Progressive merge: publish the draft as soon as the next sections in order are ready
+                    if merger is not None:
+                        released = []
+                        for task_id, section_md in output.get("sections", []):
+                            released.extend(merger.add(task_id, section_md))
+                        for task_id, section_md in released:
+                            yield ("section_appended", {"task_id": task_id, "markdown": section_md})
+                        if released:
+                            last_draft = merger.draft
+                            yield ("content", last_draft)
                 
                 # Content Streaming
                 elif name == "merge_content" and "merged_md" in output:
-                    yield ("content", output["merged_md"])
+                    # Skip the resend when the progressive draft already matches the merged document
+                    if output["merged_md"] != last_draft:
+                        yield ("content", output["merged_md"])
                 elif name == "finalize_blog" and "final" in output:
                     yield ("content", output["final"])
-                    if "seo" in output:
-                        yield ("seo", output["seo"])
                     yield ("thought", "Blog completely finished with all visuals integrated!")
         
         # 3. Final Output (For State Persistence)
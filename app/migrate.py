@@ -44,4 +44,22 @@ def run_migrations():
                 except Exception as e:
                     logger.error(f"Migration failed for '{col}': {e}")
 
+        # 4. Job queue columns (claim lease, owning worker, attempt count)
+        queue_columns = {"claimed_at": "TIMESTAMP", "worker_id": "TEXT", "attempts": "INTEGER DEFAULT 0"}
+        for col, col_type in queue_columns.items():
+            if col not in columns:
+                logger.info(f"Migrating: Adding '{col}' column to 'blog' table.")
+                try:
+                    conn.execute(text(f"ALTER TABLE blog ADD COLUMN {col} {col_type}"))
+                    conn.commit()
+                except Exception as e:
+                    logger.error(f"Migration failed for '{col}': {e}")
+
+        # 5. Workers look up claimable jobs by status, oldest first
+        try:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_blog_status_created_at ON blog (status, created_at)"))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Migration failed for 'ix_blog_status_created_at': {e}")
+
     logger.info("Database migration check complete.")
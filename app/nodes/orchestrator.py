@@ -1,24 +1,41 @@
+import os
+from typing import List
 from langgraph.types import Send
 from langchain_core.messages import SystemMessage, HumanMessage
-from ..schemas.models import State, Plan
+from ..schemas.models import State, Plan, Task, EvidenceItem
 from ..prompts.templates import ORCHESTRATION_PROMPT
-from ..services.llm_service import get_llm
+from ..services.llm_service import get_llm, cached_structured_invoke
 from ..services.logging_service import logger
+from ..utils.relevance import BM25Index
+from ..utils.evidence import rank_evidence, render_evidence
+
+# Evidence items handed to each section worker
+EVIDENCE_PER_SECTION = int(os.getenv("EVIDENCE_PER_SECTION", "6"))
+# Sections that must cite still get this many top items when nothing matches lexically
+EVIDENCE_CITATION_FALLBACK = 2
+# Evidence shown to the planner: best N by relevance to the topic and recency, within a token budget
+PLANNER_EVIDENCE_TOP_N = int(os.getenv("PLANNER_EVIDENCE_TOP_N", "16"))
+PLANNER_EVIDENCE_TOKEN_BUDGET = int(os.getenv("PLANNER_EVIDENCE_TOKEN_BUDGET", "1500"))
 
 class OrchestratorNode:
-    def __init__(self):
-        self.llm = get_llm()
+    def __init__(self, llm=None):
+        self.llm = llm or get_llm()
 
     async def __call__(self, state: State) -> dict:
         logger.info(f"--- ORCHESTRATOR NODE START ---")
-        planner = self.llm.with_structured_output(Plan)
         evidence = state.get("evidence", [])
         mode = state.get("mode", "closed_book")
         requested_tone = state.get("user_tone", "Professional")
 
         logger.info(f"Planning blog for topic with {len(evidence)} evidence items in {mode} mode. Tone: {requested_tone}")
+        planner_evidence = render_evidence(
+            rank_evidence(state["topic"], evidence, PLANNER_EVIDENCE_TOP_N),
+            PLANNER_EVIDENCE_TOKEN_BUDGET,
+        )
 
-        plan = await planner.ainvoke(
+        plan = await cached_structured_invoke(
+            self.llm,
+            Plan,
             [
                 SystemMessage(content=ORCHESTRATION_PROMPT),
                 HumanMessage(
@@ -26,11 +43,12 @@ class OrchestratorNode:
                         f"Topic: {state['topic']}\n"
                         f"Requested Tone: {requested_tone}\n"
                         f"Mode: {mode}\n"
-                        f"Evidence (ONLY use for fresh claims; may be empty):"
-                        f"{[e.model_dump() for e in evidence][:16]}"
+                        f"Evidence (ONLY use for fresh claims; may be empty):\n"
+                        f"{planner_evidence}"
                     )
                 ),
-            ]
+            ],
+            node="orchestrator",
         )
         # Ensure the plan object carries the requested tone forward
         plan.tone = requested_tone
@@ -40,9 +58,30 @@ class OrchestratorNode:
             "thought": plan.reasoning
         }
 
+def select_section_evidence(tasks: List[Task], evidence: List[EvidenceItem], k: int = EVIDENCE_PER_SECTION) -> List[List[EvidenceItem]]:
+    """Picks the top-k evidence items per task by BM25 over evidence titles and snippets."""
+    if not evidence:
+        return [[] for _ in tasks]
+
+    index = BM25Index([f"{e.title} {e.snippet or ''}" for e in evidence])
+    selections = []
+    for task in tasks:
+        query = " ".join([task.title, task.goal, *task.bullets, *task.tags])
+        picked = index.top_k(query, k)
+        if not picked and (task.requires_citation or task.requires_research):
+            picked = list(range(min(EVIDENCE_CITATION_FALLBACK, len(evidence))))
+        selections.append([evidence[i] for i in picked])
+    return selections
+
 def fanout(state: State):
     tasks = state["plan"].tasks
-    logger.info(f"Fanning out {len(tasks)} tasks to Workers.")
+    evidence = state.get("evidence", [])
+    selections = select_section_evidence(tasks, evidence)
+    logger.info(
+        f"Fanning out {len(tasks)} tasks to Workers with "
+        f"{[len(s) for s in selections]} of {len(evidence)} evidence items each."
+    )
+    plan_dump = state["plan"].model_dump()
     return [
         Send(
             "worker",
@@ -50,9 +89,9 @@ def fanout(state: State):
                 "task": task.model_dump(),
                 "topic": state["topic"],
                 "mode": state["mode"],
-                "plan": state["plan"].model_dump(),
-                "evidence": [e.model_dump() for e in state.get("evidence", [])],
+                "plan": plan_dump,
+                "evidence": [e.model_dump() for e in selected],
             },
         )
-        for task in tasks
+        for task, selected in zip(tasks, selections)
     ]
@@ -1,15 +1,50 @@
 from pathlib import Path
+from typing import List, Tuple
 import asyncio
 import json
+from langgraph.graph import END
 from langgraph.types import Send
 from langchain_core.messages import SystemMessage, HumanMessage
-from ..schemas.models import State, GlobalImagePlan, ImageTask, ImageSpec, SEOData
+from ..schemas.models import State, Plan, GlobalImagePlan, ImageTask, ImageSpec, SEOData
 from ..prompts.templates import DECIDE_IMAGES_SYSTEM
-from ..services.llm_service import get_llm
+from ..services.llm_service import get_llm, cached_structured_invoke
 from ..services.image_service import generate_image_bytes
 from ..services.logging_service import logger
 from ..utils.slug import slugify
 
+def render_draft(blog_title: str, sections: List[str]) -> str:
+    """Joins ordered section markdown under the blog title (shared by merge_content and the streaming merger)."""
+    body = "\n\n".join(sections).strip()
+    return f"# {blog_title}\n\n{body}\n"
+
+class OrderedSectionMerger:
+    """
+    Releases finished sections in task-id order as soon as each contiguous prefix is complete,
+    so a usable draft exists before the slowest worker finishes.
+    """
+    def __init__(self, plan: Plan):
+        self.blog_title = plan.blog_title
+        self.expected_ids = sorted({t.id for t in plan.tasks})
+        self._pending = {}
+        self._released = []
+
+    def add(self, task_id: int, section_md: str) -> List[Tuple[int, str]]:
+        """Buffers a finished section and returns any sections that are now releasable, in order."""
+        self._pending[task_id] = section_md
+        released = []
+        while len(self._released) < len(self.expected_ids):
+            next_id = self.expected_ids[len(self._released)]
+            if next_id not in self._pending:
+                break
+            section = (next_id, self._pending.pop(next_id))
+            self._released.append(section)
+            released.append(section)
+        return released
+
+    @property
+    def draft(self) -> str:
+        return render_draft(self.blog_title, [md for _, md in self._released])
+
 class ImageWorkerNode:
     """Standalone worker for generating a single image in parallel."""
     async def __call__(self, payload: dict) -> dict:
@@ -49,18 +84,40 @@ class ImageWorkerNode:
         }
 
 class ReducerNode:
-    def __init__(self):
-        self.llm = get_llm()
+    def __init__(self, llm=None, seo_llm=None):
+        self.llm = llm or get_llm()
+        self.seo_llm = seo_llm or self.llm
 
     async def merge_content(self, state: State) -> dict:
         logger.info(f"--- REDUCER: MERGING CONTENT START ---")
         plan = state["plan"]
         ordered_sections = [md for _, md in sorted(state["sections"], key=lambda x: x[0])]
         logger.info(f"Merging {len(ordered_sections)} sections into final blog.")
-        body = "\n\n".join(ordered_sections).strip()
-        merged_md = f"# {plan.blog_title}\n\n{body}\n"
+        merged_md = render_draft(plan.blog_title, ordered_sections)
         return {"merged_md": merged_md}
 
+    async def generate_seo(self, state: State) -> dict:
+        """Generates SEO metadata from the merged draft while images are still being produced."""
+        logger.info(f"--- REDUCER: GENERATING SEO METADATA START ---")
+        plan = state["plan"]
+        ordered_sections = [md for _, md in sorted(state["sections"], key=lambda x: x[0])]
+        body = "\n\n".join(ordered_sections).strip()
+        try:
+            seo_result = await cached_structured_invoke(
+                self.seo_llm,
+                SEOData,
+                [
+                    SystemMessage(content="You are an SEO expert. Generate a meta description (150-160 chars) and comma-separated keywords for the following blog post."),
+                    HumanMessage(content=f"Title: {plan.blog_title}\n\nContent Preview: {body[:3000]}"),
+                ],
+                node="seo",
+            )
+            seo_data = seo_result.model_dump()
+        except Exception as e:
+            logger.error(f"SEO generation failed: {e}")
+            seo_data = {"meta_description": "", "keywords": ""}
+        return {"seo": seo_data}
+
     async def decide_images(self, state: State) -> dict:
         logger.info(f"--- REDUCER: DECIDING IMAGES START (Optimized) ---")
         plan = state["plan"]
@@ -69,13 +126,14 @@ class ReducerNode:
         
         try:
             from ..schemas.models import ImageDecisionList
-            structured_llm = self.llm.with_structured_output(ImageDecisionList)
-            
-            result = await structured_llm.ainvoke(
+            result = await cached_structured_invoke(
+                self.llm,
+                ImageDecisionList,
                 [
                     SystemMessage(content=DECIDE_IMAGES_SYSTEM),
                     HumanMessage(content=f"Blog Plan:\n{json.dumps(tasks_summary, indent=2)}"),
-                ]
+                ],
+                node="decide_images",
             )
             
             image_mappings = [d.model_dump() for d in result.decisions]
@@ -90,8 +148,8 @@ class ReducerNode:
         """Dynamic fanout to parallel Image Workers."""
         specs = state.get("image_specs", [])
         if not specs:
-            logger.info("No images to generate. Finalizing.")
-            return "finalize_blog"
+            logger.info("No images to generate.")
+            return END
             
         logger.info(f"Fanning out {len(specs)} Image Tasks to workers.")
         return [
@@ -100,7 +158,7 @@ class ReducerNode:
         ]
 
     async def finalize_blog(self, state: State) -> dict:
-        """Collects results, places images, and generates SEO data."""
+        """Joins the writing and visuals branches: places images and saves the final blog."""
         logger.info(f"--- REDUCER: FINALIZING BLOG START ---")
         plan = state["plan"]
         sections_map = {task_id: content for task_id, content in state["sections"]}
@@ -120,21 +178,6 @@ class ReducerNode:
         body = "\n\n".join([sections_map[i] for i in ordered_ids]).strip()
         final_md = f"# {plan.blog_title}\n\n{body}\n"
 
-        # SEO Generation
-        logger.info("Generating SEO metadata...")
-        try:
-            seo_llm = self.llm.with_structured_output(SEOData)
-            seo_result = await seo_llm.ainvoke(
-                [
-                    SystemMessage(content="You are an SEO expert. Generate a meta description (150-160 chars) and comma-separated keywords for the following blog post."),
-                    HumanMessage(content=f"Title: {plan.blog_title}\n\nContent Preview: {body[:3000]}"),
-                ]
-            )
-            seo_data = seo_result.model_dump()
-        except Exception as e:
-            logger.error(f"SEO generation failed: {e}")
-            seo_data = {"meta_description": "", "keywords": ""}
-
         # Save file
         blogs_dir = Path("outputs/blogs")
         blogs_dir.mkdir(parents=True, exist_ok=True)
@@ -147,4 +190,4 @@ class ReducerNode:
         except Exception as e:
             logger.error(f"Failed to write final blog file: {e}")
 
-        return {"final": final_md, "seo": seo_data}
+        return {"final": final_md}
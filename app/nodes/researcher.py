@@ -1,24 +1,51 @@
+import os
+import time
 from typing import List
-import asyncio
 from langchain_core.messages import SystemMessage, HumanMessage
 from ..schemas.models import State, EvidencePack
 from ..prompts.templates import RESEARCH_SYSTEM
-from ..services.search_service import tavily_search
+from ..services.search_service import tavily_search, SEARCH_CACHE_TTL_OPEN_BOOK
+from ..services.research_service import ResearchExecutor
 from ..services.llm_service import get_llm
 from ..services.logging_service import logger
+from ..services.metrics_service import node_latency, token_usage
+from ..utils.evidence import build_evidence, pack_results
+from ..utils.queries import plan_queries
+
+# "synthesize" runs the results through an LLM; "fast" builds evidence deterministically
+RESEARCH_MODE = os.getenv("RESEARCH_MODE", "synthesize")
+RESEARCH_FAST_TOP_K = int(os.getenv("RESEARCH_FAST_TOP_K", "12"))
+RESEARCH_MODES = ("synthesize", "fast")
+
+# Query planning: near-duplicate router queries are collapsed and the fan-out is capped per job
+RESEARCH_MAX_QUERIES = int(os.getenv("RESEARCH_MAX_QUERIES", "6"))
+RESEARCH_QUERY_SIMILARITY = float(os.getenv("RESEARCH_QUERY_SIMILARITY", "0.8"))
+
+# Synthesis prompt size is capped by this budget rather than by how many results came back
+RESEARCH_PACK_TOKEN_BUDGET = int(os.getenv("RESEARCH_PACK_TOKEN_BUDGET", "3000"))
+RESEARCH_SNIPPET_MAX_CHARS = int(os.getenv("RESEARCH_SNIPPET_MAX_CHARS", "600"))
 
 class ResearcherNode:
-    def __init__(self):
-        self.llm = get_llm()
+    def __init__(self, llm=None, mode: str = None):
+        self.llm = llm or get_llm()
+        self.mode = mode or RESEARCH_MODE
+        if self.mode not in RESEARCH_MODES:
+            raise ValueError(f"Unknown research mode '{self.mode}'. Expected one of {RESEARCH_MODES}.")
 
     async def __call__(self, state: State) -> dict:
-        queries = (state.get("queries", []) or [])
-        logger.info(f"--- RESEARCHER NODE START ---")
+        requested = (state.get("queries", []) or [])
+        logger.info(f"--- RESEARCHER NODE START ({self.mode} mode) ---")
+        queries, saved = plan_queries(requested, RESEARCH_MAX_QUERIES, RESEARCH_QUERY_SIMILARITY)
+        token_usage.record("research_queries_saved", saved)
+        if saved:
+            logger.info(f"Query planner dropped {saved} of {len(requested)} queries (duplicates or over cap).")
         logger.info(f"Executing {len(queries)} queries in parallel.")
+        started = time.perf_counter()
         
-        # Parallel execution of searches
-        tasks = [tavily_search(q, max_results=6) for q in queries]
-        results = await asyncio.gather(*tasks)
+        # Deadline-bounded parallel searches (open_book topics only accept recently cached results)
+        max_age = SEARCH_CACHE_TTL_OPEN_BOOK if state.get("mode") == "open_book" else None
+        executor = ResearchExecutor(lambda q: tavily_search(q, max_results=6, max_age_seconds=max_age))
+        results = await executor.run(queries)
         
         raw_results = []
         for r in results:
@@ -28,16 +55,32 @@ class ResearcherNode:
             logger.warning("No raw research results found.")
             return {"evidence": []}
 
-        logger.info(f"Total raw results collected: {len(raw_results)}. Synthesizing...")
+        if self.mode == "fast":
+            evidence = build_evidence(results, top_k=RESEARCH_FAST_TOP_K)
+            self._record(started, tokens=0)
+            logger.info(f"Fast research built {len(evidence)} evidence items from {len(raw_results)} raw results.")
+            return {
+                "evidence": evidence,
+                "thought": f"Ranked {len(raw_results)} search results by relevance and recency, keeping the top {len(evidence)} sources."
+            }
 
-        # Structured output synthesis
-        extractor = self.llm.with_structured_output(EvidencePack)
-        pack = await extractor.ainvoke(
+        packed, packed_tokens = pack_results(results, RESEARCH_PACK_TOKEN_BUDGET, RESEARCH_SNIPPET_MAX_CHARS)
+        token_usage.record("research_packed_tokens", packed_tokens)
+        logger.info(f"Total raw results collected: {len(raw_results)}, packed into ~{packed_tokens} tokens. Synthesizing...")
+
+        # Structured output synthesis (raw message kept for token accounting)
+        extractor = self.llm.with_structured_output(EvidencePack, include_raw=True)
+        response = await extractor.ainvoke(
             [
                 SystemMessage(content=RESEARCH_SYSTEM),
-                HumanMessage(content=f"Raw results: {raw_results}"),
+                HumanMessage(content=f"Raw results:\n{packed}"),
             ]
         )
+        pack = response["parsed"]
+        if pack is None:
+            raise response["parsing_error"] or ValueError("Research synthesis returned no evidence pack.")
+        usage = getattr(response["raw"], "usage_metadata", None) or {}
+        self._record(started, tokens=usage.get("total_tokens", 0))
 
         # Deduplicate by URL
         dedup = {}
@@ -50,3 +93,9 @@ class ResearcherNode:
             "evidence": list(dedup.values()),
             "thought": pack.reasoning
         }
+
+    def _record(self, started: float, tokens: int):
+        elapsed = time.perf_counter() - started
+        node_latency.record(f"research_{self.mode}", elapsed)
+        token_usage.record(f"research_{self.mode}", tokens)
+        logger.info(f"Research ({self.mode}) finished in {elapsed:.2f}s using {tokens} LLM tokens.")
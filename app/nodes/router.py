@@ -1,24 +1,26 @@
 from langchain_core.messages import SystemMessage, HumanMessage
 from ..schemas.models import State, RouterDecision
 from ..prompts.templates import ROUTER_SYSTEM
-from ..services.llm_service import get_llm
+from ..services.llm_service import get_llm, cached_structured_invoke
 from ..services.logging_service import logger
 
 class RouterNode:
-    def __init__(self):
-        self.llm = get_llm()
+    def __init__(self, llm=None):
+        self.llm = llm or get_llm()
 
     async def __call__(self, state: State) -> dict:
         topic = state["topic"]
         logger.info(f"--- ROUTER NODE START ---")
         logger.info(f"Processing topic: {topic}")
         
-        decider = self.llm.with_structured_output(RouterDecision)
-        decision = await decider.ainvoke(
+        decision = await cached_structured_invoke(
+            self.llm,
+            RouterDecision,
             [
                 SystemMessage(content=ROUTER_SYSTEM),
                 HumanMessage(content=f"Topic: {topic}"),
-            ]
+            ],
+            node="router",
         )
 
         logger.info(f"Router Decision: Mode={decision.mode}, Needs Research={decision.needs_research}")
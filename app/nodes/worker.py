@@ -1,12 +1,19 @@
+import time
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_core.messages import SystemMessage, HumanMessage
 from ..schemas.models import Task, Plan, EvidenceItem
 from ..prompts.templates import WORKER_PROMPT
 from ..services.llm_service import get_llm
 from ..services.logging_service import logger
+from ..services.metrics_service import node_latency, token_usage
+from ..utils.tokens import estimate_tokens
+
+# Minimum seconds between section_delta events; tokens arriving in between are batched
+SECTION_DELTA_INTERVAL = 0.15
 
 class WorkerNode:
-    def __init__(self):
-        self.llm = get_llm()
+    def __init__(self, llm=None):
+        self.llm = llm or get_llm()
 
     async def __call__(self, payload: dict) -> dict:
         task = Task(**payload["task"])
@@ -27,36 +34,69 @@ class WorkerNode:
                 for e in evidence[:20]
             )
 
+        messages = [
+            SystemMessage(content=WORKER_PROMPT),
+            HumanMessage(
+                content=(
+                    f"Blog title: {plan.blog_title}"
+                    f"Audience: {plan.audience}"
+                    f"Tone: {plan.tone}"
+                    f"Blog kind: {plan.blog_kind}"
+                    f"Constraints: {plan.constraints}"
+                    f"Topic: {topic}"
+                    f"Mode: {mode}"
+                    f"Section title: {task.title}"
+                    f"Goal: {task.goal}"
+                    f"Target words: {task.target_words}"
+                    f"Tags: {task.tags}"
+                    f"requires_research: {task.requires_research}"
+                    f"requires_citations: {task.requires_citation}"
+                    f"requires_code: {task.requires_code}"
+                    f"Bullets:{bullets_text}"
+                    f"Evidence (ONLY use these URLs when citing):{evidence_text}"
+                )
+            ),
+        ]
+        token_usage.record("worker_prompt_tokens", sum(estimate_tokens(m.content) for m in messages))
+
         try:
-            res = await self.llm.ainvoke(
-                [
-                    SystemMessage(content=WORKER_PROMPT),
-                    HumanMessage(
-                        content=(
-                            f"Blog title: {plan.blog_title}"
-                            f"Audience: {plan.audience}"
-                            f"Tone: {plan.tone}"
-                            f"Blog kind: {plan.blog_kind}"
-                            f"Constraints: {plan.constraints}"
-                            f"Topic: {topic}"
-                            f"Mode: {mode}"
-                            f"Section title: {task.title}"
-                            f"Goal: {task.goal}"
-                            f"Target words: {task.target_words}"
-                            f"Tags: {task.tags}"
-                            f"requires_research: {task.requires_research}"
-                            f"requires_citations: {task.requires_citation}"
-                            f"requires_code: {task.requires_code}"
-                            f"Bullets:{bullets_text}"
-                            f"Evidence (ONLY use these URLs when citing):{evidence_text}"
-                        )
-                    ),
-                ]
-            )
-            section_md = res.content.strip()
+            section_md = await self._stream_section(task.id, messages)
             logger.info(f"Successfully wrote section: '{task.title}' ({len(section_md)} chars)")
         except Exception as e:
             logger.error(f"Worker failed for section '{task.title}': {e}")
             raise
 
         return {"sections": [(task.id, section_md)]}
+
+    async def _stream_section(self, task_id: int, messages: list) -> str:
+        """Streams the section from the LLM, emitting batched section_delta events as tokens arrive."""
+        parts = []
+        pending = []
+        started = time.perf_counter()
+        last_flush = None
+
+        async for chunk in self.llm.astream(messages):
+            text = chunk.content
+            if not text:
+                continue
+            if last_flush is None:
+                node_latency.record("worker_first_token", time.perf_counter() - started)
+                last_flush = 0.0
+            parts.append(text)
+            pending.append(text)
+            now = time.perf_counter()
+            if now - last_flush >= SECTION_DELTA_INTERVAL:
+                await self._emit_delta(task_id, "".join(pending))
+                pending.clear()
+                last_flush = now
+
+        if pending:
+            await self._emit_delta(task_id, "".join(pending))
+        return "".join(parts).strip()
+
+    async def _emit_delta(self, task_id: int, delta: str):
+        try:
+            await adispatch_custom_event("section_delta", {"task_id": task_id, "delta": delta})
+        except RuntimeError:
+            # Not running inside a traced graph run (e.g. called directly); nothing to stream to
+            pass
@@ -6,6 +6,13 @@ from pathlib import Path
 from ..database import get_session
 from ..schemas.db_models import User, Blog, Feedback, Transaction
 from ..dependencies import get_current_user
+from ..services.llm_service import llm_manager, structured_cache_stats, node_models
+from ..services.metrics_service import node_latency, token_usage
+from ..services.search_service import search_cache_stats
+from ..services.research_service import research_executor_stats
+from ..services.stream_service import stream_manager
+from ..services.job_queue import queue_stats
+from ..worker import job_worker
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -42,6 +49,21 @@ async def get_stats(session: Session = Depends(get_session), _ = Depends(check_a
         "total_revenue": total_revenue
     }
 
+@router.get("/performance")
+async def get_performance_stats(_ = Depends(check_admin)):
+    """Per-worker performance counters (each Gunicorn worker reports its own)."""
+    return {
+        "llm_pool": llm_manager.stats(),
+        "llm_cache": structured_cache_stats(),
+        "node_models": node_models,
+        "node_latency": node_latency.stats(),
+        "token_usage": token_usage.stats(),
+        "search_cache": search_cache_stats(),
+        "research_executor": research_executor_stats(),
+        "streams": stream_manager.stats(),
+        "job_queue": {**queue_stats(), "worker": job_worker.stats()},
+    }
+
 @router.get("/transactions")
 async def list_transactions(session: Session = Depends(get_session), _ = Depends(check_admin)):
     """Fetch all successful credit purchases with user details."""
@@ -97,6 +97,11 @@ class Blog(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+    # Job queue: which generation worker holds the job, since when (lease), and how many claims it took
+    claimed_at: Optional[datetime] = Field(default=None)
+    worker_id: Optional[str] = Field(default=None)
+    attempts: int = Field(default=0)
+
 class Transaction(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id", index=True)
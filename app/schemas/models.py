@@ -72,6 +72,17 @@ class SEOData(BaseModel):
     meta_description: str = Field(..., description="SEO meta description (150-160 chars)")
     keywords: str = Field(..., description="Comma-separated SEO keywords")
 
+class WritingOutput(TypedDict):
+    """Keys the writing subgraph hands back to the main graph."""
+    sections: Annotated[List[tuple[int, str]], operator.add]
+    merged_md: str
+    seo: Dict[str, str]
+
+class VisualsOutput(TypedDict):
+    """Keys the visuals subgraph hands back to the main graph."""
+    image_specs: List[dict]
+    image_results: Annotated[List[tuple[str, str, bool, int]], operator.add]
+
 class State(TypedDict):
     topic: str
     user_tone: str
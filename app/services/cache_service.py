@@ -0,0 +1,115 @@
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+from typing import Optional
+from .logging_service import logger
+
+# A single SQLite file shared by every Gunicorn worker on the host (WAL allows concurrent readers)
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "cache.db")
+
+# How many writes between size checks; avoids a COUNT(*) on every insert
+_EVICTION_CHECK_INTERVAL = 50
+
+
+class SQLiteCache:
+    """
+    Namespaced key/value cache persisted in SQLite with TTL and size-based eviction.
+    Blocking sqlite calls run in a thread via the async helpers so the event loop stays free.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: int, max_entries: int, path: str = CACHE_DB_PATH):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_created ON cache_entries (namespace, created_at)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, max_age_seconds: Optional[int] = None) -> Optional[str]:
+        """Returns the cached value, or None if missing, expired, or older than max_age_seconds."""
+        now = time.time()
+        oldest = now - max_age_seconds if max_age_seconds is not None else 0
+        try:
+            row = self._conn().execute(
+                "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ? AND created_at >= ?",
+                (self.namespace, key, now, oldest),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed ({self.namespace}): {e}")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[int] = None):
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, value, now, now + ttl),
+            )
+            self._writes += 1
+            if self._writes % _EVICTION_CHECK_INTERVAL == 0:
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed ({self.namespace}): {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drops expired rows, then the oldest rows beyond max_entries."""
+        expired = conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?", (self.namespace, now)
+        ).rowcount
+        overflow = conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries),
+        ).rowcount
+        self.evictions += expired + overflow
+        if expired or overflow:
+            logger.debug(f"Cache '{self.namespace}' evicted {expired} expired and {overflow} overflow entries.")
+
+    async def aget(self, key: str, max_age_seconds: Optional[int] = None) -> Optional[str]:
+        return await asyncio.to_thread(self.get, key, max_age_seconds)
+
+    async def aset(self, key: str, value: str, ttl_seconds: Optional[int] = None):
+        await asyncio.to_thread(self.set, key, value, ttl_seconds)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+        }
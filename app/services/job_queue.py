@@ -0,0 +1,113 @@
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import and_, case, func, or_, select, update
+from ..database import engine
+from ..schemas.db_models import Blog
+from .logging_service import logger
+
+# A claimed job whose worker stops renewing its lease for this long is handed to another worker
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+# Claims per job (first run included) before a job whose workers keep dying is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+ClaimedJob = Tuple[str, str, str, int]  # (job_id, topic, tone, attempts)
+
+
+def claim_job(worker_id: str, lease_seconds: int = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS,
+              prefer: Optional[Iterable[str]] = None, others_after: Optional[float] = None) -> Optional[ClaimedJob]:
+    """
+    Atomically claims the oldest queued job, or a processing job whose lease expired
+    (its worker died), for worker_id. Returns None when nothing is claimable.
+    With `prefer`, those queued jobs go first; `others_after` additionally leaves every other
+    queued job alone until it has waited that many seconds.
+    """
+    now = datetime.utcnow()
+    preferred = Blog.job_id.in_(list(prefer or []))
+    queued = Blog.status == "queued"
+    if others_after is not None:
+        queued = and_(queued, or_(preferred, Blog.created_at < now - timedelta(seconds=others_after)))
+    # Postgres: FOR UPDATE SKIP LOCKED lets concurrent workers pass over rows another one is claiming.
+    # SQLite drops the locking clause; its single UPDATE ... RETURNING runs under the database write lock.
+    candidate = (
+        select(Blog.id)
+        .where(or_(
+            queued,
+            and_(Blog.status == "processing", Blog.claimed_at < now - timedelta(seconds=lease_seconds),
+                 Blog.attempts < max_attempts),
+        ))
+        .order_by(case((preferred, 0), else_=1), Blog.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    statement = (
+        update(Blog)
+        .where(Blog.id == candidate)
+        .values(status="processing", claimed_at=now, worker_id=worker_id, attempts=func.coalesce(Blog.attempts, 0) + 1)
+        .returning(Blog.job_id, Blog.topic, Blog.tone, Blog.attempts)
+    )
+    with engine.begin() as conn:
+        row = conn.execute(statement).first()
+    if row is None:
+        return None
+    job_id, topic, tone, attempts = row
+    if attempts > 1:
+        logger.warning(f"Worker {worker_id} reclaimed job {job_id} (attempt {attempts}).")
+    return job_id, topic, tone or "Professional", attempts
+
+
+def renew_lease(job_id: str, worker_id: str) -> bool:
+    """Extends the lease on a job this worker is running. False if the job is no longer ours."""
+    statement = (
+        update(Blog)
+        .where(Blog.job_id == job_id, Blog.worker_id == worker_id, Blog.status == "processing")
+        .values(claimed_at=datetime.utcnow())
+    )
+    with engine.begin() as conn:
+        return conn.execute(statement).rowcount > 0
+
+
+def release_job(job_id: str, worker_id: str) -> bool:
+    """Puts a job this worker is giving up (shutdown) back in the queue for the next worker."""
+    statement = (
+        update(Blog)
+        .where(Blog.job_id == job_id, Blog.worker_id == worker_id, Blog.status == "processing")
+        # The interrupted run doesn't count against the job's attempts
+        .values(status="queued", claimed_at=None, worker_id=None, attempts=Blog.attempts - 1)
+    )
+    with engine.begin() as conn:
+        return conn.execute(statement).rowcount > 0
+
+
+def fail_exhausted_jobs(lease_seconds: int = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS) -> List[str]:
+    """Marks expired-lease jobs that already used every attempt as failed. Returns their job ids."""
+    now = datetime.utcnow()
+    statement = (
+        update(Blog)
+        .where(Blog.status == "processing", Blog.claimed_at < now - timedelta(seconds=lease_seconds),
+               Blog.attempts >= max_attempts)
+        .values(status="failed", error=f"Generation worker stopped responding ({max_attempts} attempts).", updated_at=now)
+        .returning(Blog.job_id)
+    )
+    with engine.begin() as conn:
+        job_ids = [row[0] for row in conn.execute(statement)]
+    if job_ids:
+        logger.error(f"Marked {len(job_ids)} jobs failed after {max_attempts} lost attempts: {job_ids}")
+    return job_ids
+
+
+def queue_stats() -> dict:
+    """Queue depth shared by all workers."""
+    with engine.connect() as conn:
+        counts = dict(conn.execute(
+            select(Blog.status, func.count()).where(Blog.status.in_(["queued", "processing"])).group_by(Blog.status)
+        ).all())
+        oldest = conn.execute(select(func.min(Blog.created_at)).where(Blog.status == "queued")).scalar()
+    return {
+        "queued": counts.get("queued", 0),
+        "processing": counts.get("processing", 0),
+        "oldest_queued_seconds": round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else None,
+        "lease_seconds": JOB_LEASE_SECONDS,
+        "max_attempts": JOB_MAX_ATTEMPTS,
+    }
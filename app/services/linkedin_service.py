@@ -1,7 +1,7 @@
 import json
 import httpx
 from typing import Optional
-from .llm_service import get_llm
+from .llm_service import get_node_llm
 from langchain_core.messages import HumanMessage, SystemMessage
 from .logging_service import logger
 
@@ -55,7 +55,7 @@ class LinkedInService:
     @staticmethod
     async def generate_teaser(blog_content: str, blog_title: str) -> str:
         """Uses AI to transform a markdown blog into a viral LinkedIn teaser."""
-        llm = get_llm()
+        llm = get_node_llm("linkedin_teaser")
         
         prompt = f"""
         You are a world-class social media strategist and ghostwriter for top tech influencers.
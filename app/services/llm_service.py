@@ -1,14 +1,279 @@
 import os
+import json
+import hashlib
+import threading
+import httpx
+from typing import List, Type
+from pydantic import BaseModel
+from langchain_core.messages import BaseMessage
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
+from .cache_service import SQLiteCache
 from .logging_service import logger
 
 load_dotenv()
 
-def get_llm(model="gpt-4o-mini"):
-    logger.debug(f"Initializing ChatOpenAI with model: {model}")
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.error("OPENAI_API_KEY not found in environment variables.")
-        raise RuntimeError("OPENAI_API_KEY is not set.")
-    return ChatOpenAI(model=model, api_key=api_key)
+# Shared HTTP transport settings for all OpenAI clients
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+
+# Per-node model tiers. Override any subset via LLM_NODE_CONFIG, a path to a JSON file such as
+# {"router": {"model": "gpt-4o-mini", "temperature": 0, "max_tokens": 600}, "worker": {"model": "gpt-4o"}}
+# A None value leaves that parameter at the provider default; temperature and max_tokens stay there
+# unless configured, so the defaults reproduce the single shared client every node used before.
+DEFAULT_NODE_MODELS = {
+    "router": {"model": "gpt-4o-mini", "temperature": None, "max_tokens": None, "timeout": 30},
+    "research": {"model": "gpt-4o-mini", "temperature": None, "max_tokens": None, "timeout": 90},
+    "orchestrator": {"model": "gpt-4o-mini", "temperature": None, "max_tokens": None, "timeout": 90},
+    "worker": {"model": "gpt-4o-mini", "temperature": None, "max_tokens": None, "timeout": 120},
+    "decide_images": {"model": "gpt-4o-mini", "temperature": None, "max_tokens": None, "timeout": 45},
+    "seo": {"model": "gpt-4o-mini", "temperature": None, "max_tokens": None, "timeout": 30},
+    "linkedin_teaser": {"model": "gpt-4o-mini", "temperature": None, "max_tokens": None, "timeout": 60},
+}
+NODE_MODEL_PARAMS = ("model", "temperature", "max_tokens", "timeout")
+node_models = {}
+
+# Opt-in cache for structured (with_structured_output) calls
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+LLM_CACHE_NODES = {n.strip() for n in os.getenv("LLM_CACHE_NODES", "router,orchestrator,decide_images,seo").split(",") if n.strip()}
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Wraps a response body so a request only stops counting as in-flight once its body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+class _TrackedTransport(httpx.AsyncBaseTransport):
+    """Keep-alive transport that records in-flight requests and pool waits."""
+
+    def __init__(self, stats: dict, limits: httpx.Limits):
+        self._transport = httpx.AsyncHTTPTransport(limits=limits)
+        self._max_connections = limits.max_connections
+        self._stats = stats
+
+    def _release(self):
+        self._stats["in_use"] -= 1
+
+    async def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self._stats["connections_opened"] += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self._stats
+        stats["requests"] += 1
+        request.extensions.setdefault("trace", self._trace)
+        if self._max_connections and stats["in_use"] >= self._max_connections:
+            # Every connection is busy, so this request queues inside the pool
+            stats["waits"] += 1
+        stats["in_use"] += 1
+        stats["peak_in_use"] = max(stats["peak_in_use"], stats["in_use"])
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._release()
+            raise
+        response.stream = _TrackedStream(response.stream, self._release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class LLMClientManager:
+    """
+    Hands out ChatOpenAI clients from a pool keyed by model and parameters.
+    All pooled clients share one keep-alive HTTP transport, so jobs reuse TLS connections.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._http_async_client = None
+        self._http_client = None
+        self._client_hits = 0
+        self._client_misses = 0
+        self._transport_stats = {
+            "requests": 0, "in_use": 0, "peak_in_use": 0, "waits": 0, "connections_opened": 0,
+        }
+        self.limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        )
+        self.timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+    def _http_clients(self):
+        if self._http_async_client is None:
+            self._http_async_client = httpx.AsyncClient(
+                transport=_TrackedTransport(self._transport_stats, self.limits),
+                timeout=self.timeout,
+            )
+            self._http_client = httpx.Client(limits=self.limits, timeout=self.timeout)
+        return self._http_async_client, self._http_client
+
+    def get(self, model: str = "gpt-4o-mini", **params) -> ChatOpenAI:
+        key = (model, tuple(sorted(params.items())))
+        client = self._clients.get(key)
+        if client is not None:
+            self._client_hits += 1
+            return client
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            logger.error("OPENAI_API_KEY not found in environment variables.")
+            raise RuntimeError("OPENAI_API_KEY is not set.")
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                logger.debug(f"Initializing pooled ChatOpenAI with model: {model}, params: {params}")
+                http_async_client, http_client = self._http_clients()
+                client = ChatOpenAI(
+                    model=model,
+                    api_key=api_key,
+                    http_async_client=http_async_client,
+                    http_client=http_client,
+                    **params,
+                )
+                self._clients[key] = client
+                self._client_misses += 1
+            else:
+                self._client_hits += 1
+        return client
+
+    def stats(self) -> dict:
+        lookups = self._client_hits + self._client_misses
+        requests = self._transport_stats["requests"]
+        opened = self._transport_stats["connections_opened"]
+        return {
+            "clients": len(self._clients),
+            "client_hits": self._client_hits,
+            "client_misses": self._client_misses,
+            "client_reuse_ratio": round(self._client_hits / lookups, 3) if lookups else 0.0,
+            "requests": requests,
+            "connections_in_use": self._transport_stats["in_use"],
+            "peak_connections_in_use": self._transport_stats["peak_in_use"],
+            "pool_waits": self._transport_stats["waits"],
+            "connections_opened": opened,
+            "connection_reuse_ratio": round(max(0.0, 1 - opened / requests), 3) if requests else 0.0,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+        }
+
+    async def aclose(self):
+        """Closes the shared transport. Clients handed out earlier must not be used afterwards."""
+        with self._lock:
+            self._clients.clear()
+            http_async_client, http_client = self._http_async_client, self._http_client
+            self._http_async_client = self._http_client = None
+        if http_async_client is not None:
+            await http_async_client.aclose()
+            http_client.close()
+
+
+llm_manager = LLMClientManager()
+
+def get_llm(model="gpt-4o-mini", **params):
+    return llm_manager.get(model, **params)
+
+
+def load_node_models(path: str = None) -> dict:
+    """
+    Loads the per-node model map (defaults overlaid with LLM_NODE_CONFIG) into node_models.
+    Runs once at import; after a reload, get_workflow() compiles graphs with the new tiers.
+    """
+    path = path or os.getenv("LLM_NODE_CONFIG")
+    config = {node: dict(cfg) for node, cfg in DEFAULT_NODE_MODELS.items()}
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                overrides = json.load(f)
+            for node, params in overrides.items():
+                unknown = set(params) - set(NODE_MODEL_PARAMS)
+                if unknown:
+                    logger.warning(f"Ignoring unknown LLM params for node '{node}': {sorted(unknown)}")
+                config.setdefault(node, {}).update({k: v for k, v in params.items() if k in NODE_MODEL_PARAMS})
+            logger.info(f"Loaded per-node LLM config from {path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load LLM_NODE_CONFIG '{path}', using defaults: {e}")
+
+    node_models.clear()
+    node_models.update(config)
+    return node_models
+
+load_node_models()
+
+def get_node_llm(node: str) -> ChatOpenAI:
+    """Returns the pooled client configured for a graph node (falls back to the default model)."""
+    params = {k: v for k, v in node_models.get(node, {}).items() if v is not None}
+    model = params.pop("model", "gpt-4o-mini")
+    return get_llm(model, **params)
+
+structured_cache = SQLiteCache("llm_structured", ttl_seconds=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES)
+_structured_cache_counters = {}
+
+def _structured_cache_key(llm: ChatOpenAI, schema: Type[BaseModel], messages: List[BaseMessage]) -> str:
+    payload = {
+        "model": getattr(llm, "model_name", None),
+        "temperature": getattr(llm, "temperature", None),
+        # A tighter cap can truncate the output, so results under different caps must not be shared
+        "max_tokens": getattr(llm, "max_tokens", None),
+        "schema": schema.model_json_schema(),
+        "messages": [(m.type, m.content) for m in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+async def cached_structured_invoke(llm: ChatOpenAI, schema: Type[BaseModel], messages: List[BaseMessage], node: str) -> BaseModel:
+    """
+    Runs llm.with_structured_output(schema).ainvoke(messages), serving exact repeats from the
+    shared SQLite cache when LLM_CACHE_ENABLED is set and the node is listed in LLM_CACHE_NODES.
+    """
+    runnable = llm.with_structured_output(schema)
+    if not (LLM_CACHE_ENABLED and node in LLM_CACHE_NODES):
+        return await runnable.ainvoke(messages)
+
+    counters = _structured_cache_counters.setdefault(node, {"hits": 0, "misses": 0})
+    key = _structured_cache_key(llm, schema, messages)
+    cached = await structured_cache.aget(key)
+    if cached is not None:
+        try:
+            result = schema.model_validate_json(cached)
+            counters["hits"] += 1
+            logger.info(f"LLM cache hit for node '{node}'.")
+            return result
+        except ValueError as e:
+            logger.warning(f"Discarding unreadable LLM cache entry for node '{node}': {e}")
+
+    counters["misses"] += 1
+    result = await runnable.ainvoke(messages)
+    await structured_cache.aset(key, result.model_dump_json())
+    return result
+
+def structured_cache_stats() -> dict:
+    return {
+        "enabled": LLM_CACHE_ENABLED,
+        "nodes": sorted(LLM_CACHE_NODES),
+        "per_node": {node: dict(c) for node, c in _structured_cache_counters.items()},
+        "store": structured_cache.stats(),
+    }
@@ -0,0 +1,84 @@
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict
+
+# Number of recent samples kept per metric for percentile estimates
+WINDOW_SIZE = 500
+
+
+class LatencyRecorder:
+    """In-process rolling latency samples per name (e.g. per graph node)."""
+
+    def __init__(self, window: int = WINDOW_SIZE):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float):
+        self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+        self._counts[name] = self._counts.get(name, 0) + 1
+
+    @asynccontextmanager
+    async def track(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def sample_count(self, name: str) -> int:
+        return len(self._samples.get(name, ()))
+
+    def percentile(self, name: str, pct: float):
+        samples = self._samples.get(name)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+    def stats(self) -> dict:
+        report = {}
+        for name, samples in self._samples.items():
+            ordered = sorted(samples)
+            report[name] = {
+                "count": self._counts[name],
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1),
+            }
+        return report
+
+
+class UsageRecorder:
+    """In-process running totals per name, e.g. tokens spent per research mode."""
+
+    def __init__(self):
+        self._totals: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, name: str, amount: float):
+        self._totals[name] = self._totals.get(name, 0) + amount
+        self._counts[name] = self._counts.get(name, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "count": self._counts[name],
+                "total": self._totals[name],
+                "mean": round(self._totals[name] / self._counts[name], 1),
+            }
+            for name in self._totals
+        }
+
+
+node_latency = LatencyRecorder()
+token_usage = UsageRecorder()
+
+def timed_node(name: str, fn):
+    """Wraps a graph node callable so each run is recorded under `name`."""
+    async def run(state):
+        async with node_latency.track(name):
+            return await fn(state)
+    return run
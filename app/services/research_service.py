@@ -0,0 +1,127 @@
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+from .logging_service import logger
+from .metrics_service import node_latency
+from .search_service import SEARCH_LATENCY_METRIC
+
+# Per-job research budget: queries still running at the deadline are cancelled and skipped
+RESEARCH_DEADLINE = float(os.getenv("RESEARCH_DEADLINE", "20"))
+RESEARCH_CONCURRENCY = int(os.getenv("RESEARCH_CONCURRENCY", "4"))
+RESEARCH_QUERY_TIMEOUT = float(os.getenv("RESEARCH_QUERY_TIMEOUT", "8"))
+# A duplicate request fires once a query runs longer than this percentile of recent search latency
+RESEARCH_HEDGE_ENABLED = os.getenv("RESEARCH_HEDGE_ENABLED", "true").lower() == "true"
+RESEARCH_HEDGE_PERCENTILE = float(os.getenv("RESEARCH_HEDGE_PERCENTILE", "0.9"))
+RESEARCH_HEDGE_MIN_SAMPLES = int(os.getenv("RESEARCH_HEDGE_MIN_SAMPLES", "20"))
+
+_counters = {"queries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0, "hedges_skipped": 0, "deadline_hits": 0, "skipped": 0}
+
+SearchFn = Callable[[str], Awaitable[List[dict]]]
+
+
+def hedge_after(query_timeout: float = RESEARCH_QUERY_TIMEOUT) -> Optional[float]:
+    """Seconds after which a search gets a hedged duplicate, or None until enough latency samples exist."""
+    if node_latency.sample_count(SEARCH_LATENCY_METRIC) < RESEARCH_HEDGE_MIN_SAMPLES:
+        return None
+    delay = node_latency.percentile(SEARCH_LATENCY_METRIC, RESEARCH_HEDGE_PERCENTILE)
+    return delay if delay is not None and delay < query_timeout else None
+
+
+class ResearchExecutor:
+    """
+    Runs one job's search queries under a deadline with bounded concurrency.
+    Each query has its own timeout and may be hedged with a duplicate request when a
+    concurrency slot is free (hedges count against the same limit as queries);
+    whatever has returned when the deadline hits is used and the rest is dropped.
+    """
+
+    def __init__(
+        self,
+        search: SearchFn,
+        deadline: float = RESEARCH_DEADLINE,
+        concurrency: int = RESEARCH_CONCURRENCY,
+        query_timeout: float = RESEARCH_QUERY_TIMEOUT,
+        hedge: bool = RESEARCH_HEDGE_ENABLED,
+    ):
+        self.search = search
+        self.deadline = deadline
+        self.concurrency = max(1, concurrency)
+        self.query_timeout = query_timeout
+        self.hedge = hedge
+
+    async def run(self, queries: List[str]) -> List[List[dict]]:
+        """Returns one result list per query, in query order (empty for failed or skipped queries)."""
+        results: List[List[dict]] = [[] for _ in queries]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(index: int, query: str):
+            async with semaphore:
+                results[index] = await self._run_query(query, semaphore)
+
+        tasks = [asyncio.create_task(run_one(i, q)) for i, q in enumerate(queries)]
+        if not tasks:
+            return results
+
+        _, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        if pending:
+            _counters["deadline_hits"] += 1
+            _counters["skipped"] += len(pending)
+            logger.warning(f"Research deadline ({self.deadline}s) hit; using partial results, {len(pending)} queries skipped.")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return results
+
+    async def _run_query(self, query: str, semaphore: asyncio.Semaphore) -> List[dict]:
+        _counters["queries"] += 1
+        started = time.perf_counter()
+        primary = asyncio.create_task(self.search(query))
+        attempts = {primary}
+        try:
+            hedge_delay = hedge_after(self.query_timeout) if self.hedge else None
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+                if not done and semaphore.locked():
+                    # Every slot is busy or awaited: a duplicate would push the provider past RESEARCH_CONCURRENCY
+                    _counters["hedges_skipped"] += 1
+                elif not done:
+                    _counters["hedges"] += 1
+                    logger.debug(f"Hedging slow search after {hedge_delay:.2f}s: '{query}'")
+                    await semaphore.acquire()
+                    hedge = asyncio.create_task(self.search(query))
+                    hedge.add_done_callback(lambda _: semaphore.release())
+                    attempts.add(hedge)
+
+            pending = set(attempts)
+            while pending:
+                remaining = self.query_timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result():
+                        if task is not primary:
+                            _counters["hedge_wins"] += 1
+                        return task.result()
+                if not pending:
+                    # Every attempt finished without results
+                    return []
+
+            _counters["timeouts"] += 1
+            logger.warning(f"Search timed out after {self.query_timeout}s: '{query}'")
+            return []
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+
+def research_executor_stats() -> dict:
+    return {
+        **_counters,
+        "deadline_seconds": RESEARCH_DEADLINE,
+        "concurrency": RESEARCH_CONCURRENCY,
+        "query_timeout_seconds": RESEARCH_QUERY_TIMEOUT,
+        "hedge_after_seconds": hedge_after() if RESEARCH_HEDGE_ENABLED else None,
+    }
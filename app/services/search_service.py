@@ -1,22 +1,66 @@
-from typing import List
+import os
+import re
+import json
+import time
+import random
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
 from langchain_community.tools.tavily_search import TavilySearchResults
+from .cache_service import SQLiteCache
+from ..utils.queries import normalize_query
 from .logging_service import logger
+from .metrics_service import node_latency
 import asyncio
 
-async def tavily_search(query: str, max_results: int = 5) -> List[dict]:
-    logger.info(f"Initiating search for query: '{query}'")
-    try:
-        # TavilySearchResults.ainvoke is the async version
-        tool = TavilySearchResults(max_results=max_results)
-        results = await tool.ainvoke({"query": query})
-        logger.debug(f"Search successful. Found {len(results) if results else 0} results.")
-    except Exception as e:
-        logger.error(f"Search failed for query '{query}': {e}")
-        return []
+# "tavily" searches the web; "fixture" replays stored results offline (benchmarks, load tests)
+SEARCH_PROVIDER = os.getenv("SEARCH_PROVIDER", "tavily")
+SEARCH_FIXTURE_PATH = os.getenv("SEARCH_FIXTURE_PATH")
+SEARCH_FIXTURE_LATENCY_MS = float(os.getenv("SEARCH_FIXTURE_LATENCY_MS", "300"))
+SEARCH_FIXTURE_JITTER_MS = float(os.getenv("SEARCH_FIXTURE_JITTER_MS", "150"))
+
+# Search results are shared across jobs and workers; time-sensitive callers pass a shorter max age
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(6 * 3600)))
+SEARCH_CACHE_TTL_OPEN_BOOK = int(os.getenv("SEARCH_CACHE_TTL_OPEN_BOOK", str(30 * 60)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "20000"))
+
+# Provider round-trip latency (cache hits excluded); the research executor hedges against its percentiles
+SEARCH_LATENCY_METRIC = "search_query"
+
+search_cache = SQLiteCache("search", ttl_seconds=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES)
+
 
-    normalized: List[dict] = []
-    for r in results or []:
-        normalized.append(
+class SearchProvider(ABC):
+    """
+    Backend for web search. search() returns normalized results
+    ({title, url, snippet, published_at, source}) best first, and raises on failure.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def search(self, query: str, max_results: int) -> List[dict]:
+        ...
+
+
+class TavilySearchProvider(SearchProvider):
+    name = "tavily"
+
+    def __init__(self):
+        # One tool instance per result size; TavilySearchResults is stateless between calls
+        self._tools = {}
+
+    def _get_tool(self, max_results: int):
+        tool = self._tools.get(max_results)
+        if tool is None:
+            tool = self._tools[max_results] = TavilySearchResults(max_results=max_results)
+        return tool
+
+    async def search(self, query: str, max_results: int) -> List[dict]:
+        # TavilySearchResults.ainvoke is the async version
+        results = await self._get_tool(max_results).ainvoke({"query": query})
+        return [
             {
                 "title": r.get("title") or "",
                 "url": r.get("url") or "",
@@ -24,5 +68,107 @@ async def tavily_search(query: str, max_results: int = 5) -> List[dict]:
                 "published_at": r.get("published_date") or r.get("published_at"),
                 "source": r.get("source"),
             }
-        )
+            for r in results or []
+        ]
+
+
+class FixtureSearchProvider(SearchProvider):
+    """
+    Replays stored results with simulated latency, so research can run without network access.
+    The fixture file maps queries to result lists; queries it doesn't know get deterministic
+    synthetic results derived from the query text.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path: Optional[str] = SEARCH_FIXTURE_PATH, latency_ms: float = SEARCH_FIXTURE_LATENCY_MS,
+                 jitter_ms: float = SEARCH_FIXTURE_JITTER_MS):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fixtures: Dict[str, List[dict]] = {}
+        if path:
+            with open(path, encoding="utf-8") as f:
+                self.fixtures = {normalize_query(q): results for q, results in json.load(f).items()}
+            logger.info(f"Loaded {len(self.fixtures)} search fixtures from {path}")
+
+    async def search(self, query: str, max_results: int) -> List[dict]:
+        delay = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        normalized = normalize_query(query)
+        results = self.fixtures.get(normalized)
+        if results is None:
+            results = self._synthetic(normalized, max_results)
+        return results[:max_results]
+
+    @staticmethod
+    def _synthetic(normalized: str, count: int) -> List[dict]:
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:8]
+        slug = re.sub(r"[^a-z0-9]+", "-", normalized).strip("-") or "query"
+        return [
+            {
+                "title": f"{normalized.title()} ({i + 1})",
+                "url": f"https://fixture-{digest}-{i}.example.com/{slug}",
+                "snippet": f"Stored result {i + 1} about {normalized}. " * 6,
+                "published_at": f"2025-{(i % 12) + 1:02d}-01",
+                "source": "fixture",
+            }
+            for i in range(count)
+        ]
+
+
+SEARCH_PROVIDERS = {"tavily": TavilySearchProvider, "fixture": FixtureSearchProvider}
+_provider: Optional[SearchProvider] = None
+
+def get_search_provider() -> SearchProvider:
+    """
+    Returns the process-wide provider chosen by SEARCH_PROVIDER. Processes call it at startup so an
+    unknown provider stops them there instead of turning every search into an empty result.
+    """
+    global _provider
+    if _provider is None:
+        if SEARCH_PROVIDER not in SEARCH_PROVIDERS:
+            raise ValueError(f"Unknown SEARCH_PROVIDER '{SEARCH_PROVIDER}'. Expected one of {sorted(SEARCH_PROVIDERS)}.")
+        _provider = SEARCH_PROVIDERS[SEARCH_PROVIDER]()
+        logger.info(f"Using '{_provider.name}' search provider.")
+    return _provider
+
+def set_search_provider(provider: SearchProvider):
+    """Swaps the process-wide provider (benchmarks and offline runs)."""
+    global _provider
+    _provider = provider
+
+async def tavily_search(query: str, max_results: int = 5, max_age_seconds: Optional[int] = None) -> List[dict]:
+    """
+    Searches via the configured provider, serving results from the shared cache when a fresh enough
+    entry exists. max_age_seconds narrows freshness for time-sensitive (open_book) research.
+    """
+    provider = get_search_provider()
+    cache_key = f"{provider.name}:{max_results}:{normalize_query(query)}"
+    if SEARCH_CACHE_ENABLED:
+        cached = await search_cache.aget(cache_key, max_age_seconds)
+        if cached is not None:
+            logger.info(f"Search cache hit for query: '{query}'")
+            return json.loads(cached)
+
+    logger.info(f"Initiating search for query: '{query}'")
+    try:
+        started = time.perf_counter()
+        normalized = await provider.search(query, max_results)
+        node_latency.record(SEARCH_LATENCY_METRIC, time.perf_counter() - started)
+        logger.debug(f"Search successful. Found {len(normalized)} results.")
+    except Exception as e:
+        logger.error(f"Search failed for query '{query}': {e}")
+        return []
+
+    # Empty responses are not cached so a transient provider issue doesn't stick
+    if SEARCH_CACHE_ENABLED and normalized:
+        await search_cache.aset(cache_key, json.dumps(normalized))
     return normalized
+
+def search_cache_stats() -> dict:
+    return {
+        "provider": _provider.name if _provider else SEARCH_PROVIDER,
+        "enabled": SEARCH_CACHE_ENABLED,
+        "open_book_max_age_seconds": SEARCH_CACHE_TTL_OPEN_BOOK,
+        **search_cache.stats(),
+    }
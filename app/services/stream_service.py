@@ -0,0 +1,843 @@
+import os
+import re
+import time
+import asyncio
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import orjson
+import redis.asyncio as aioredis
+from .logging_service import logger
+
+# "memory://" (default) keeps streams inside this worker; "redis://host:6379/0" shares them across workers
+STREAM_BROKER_URL = os.getenv("STREAM_BROKER_URL", "memory://")
+# Upper bound on how long a stream lives in the shared broker, and how long it is kept after the job ends
+STREAM_MAX_AGE = int(os.getenv("STREAM_MAX_AGE", "7200"))
+STREAM_RETENTION = int(os.getenv("STREAM_RETENTION", "300"))
+# Events kept per job for Last-Event-ID replay; beyond this the oldest droppable events are evicted
+STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", "1000"))
+# Thoughts kept per job in the replay buffer (older ones are dropped; /status still has all of them)
+STREAM_MAX_THOUGHTS = int(os.getenv("STREAM_MAX_THOUGHTS", "50"))
+# Streams with no new event for this long are evicted even if they never ended (crashed or abandoned jobs)
+STREAM_IDLE_TTL = int(os.getenv("STREAM_IDLE_TTL", "900"))
+# Payload bytes this worker may hold across all streams it publishes; finished, then least recently active, go first
+STREAM_MAX_BYTES = int(os.getenv("STREAM_MAX_BYTES", str(64 * 1024 * 1024)))
+STREAM_SWEEP_INTERVAL = float(os.getenv("STREAM_SWEEP_INTERVAL", "30"))
+# How long a reader of a queued job waits for this process to claim it before the stream counts as not found
+# (memory:// only: a job claimed by another process never publishes here)
+STREAM_CLAIM_GRACE = float(os.getenv("STREAM_CLAIM_GRACE", "5"))
+
+# Only the newest event of these kinds matters: each one replaces the previous snapshot.
+# `content` is not among them: it travels as deltas, with the full document kept as a separate snapshot.
+SNAPSHOT_EVENTS = {"seo", "plan", "evidence", "image_specs"}
+# Evicted first on overflow; other unprotected events (content, seo, ...) only after these run out
+LOW_VALUE_EVENTS = {"section_delta", "thought", "section_appended"}
+# Never evicted from a job's buffer
+PROTECTED_EVENTS = {"end", "error", "complete", "plan", "evidence", "image_specs"}
+STREAM_HEARTBEAT_SECONDS = 15.0
+# Recent events each worker keeps per watched job for its subscribers; the bound on subscriber lag
+STREAM_HUB_WINDOW = int(os.getenv("STREAM_HUB_WINDOW", "256"))
+# Messages queued per WebSocket connection; a slow client pauses its job forwarders, which catch up from the broker
+STREAM_WS_OUTBOX_SIZE = int(os.getenv("STREAM_WS_OUTBOX_SIZE", "256"))
+
+# Recently evicted job ids remembered so a still-running job's later events are dropped, not re-published
+_EVICTED_HISTORY = 10000
+
+# A stream entry: (entry_id, event, JSON-encoded data)
+StreamEntry = Tuple[str, str, bytes]
+# Entry ids: Redis stream ids ("<ms>-<seq>", or just "<ms>") and MemoryBroker sequence numbers
+_STREAM_ID_PATTERN = re.compile(r"[0-9]+(-[0-9]+)?")
+_SEQ_ID_PATTERN = re.compile(r"[0-9]+")
+
+
+def _jsonable(obj):
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def encode_json(obj: Any) -> bytes:
+    """Encodes an event payload (Pydantic models included) to JSON bytes in one pass."""
+    return orjson.dumps(obj, default=_jsonable, option=orjson.OPT_NON_STR_KEYS)
+
+
+def encode_json_array(items: List[bytes]) -> str:
+    """Joins already-encoded JSON values into a JSON array string without re-encoding them."""
+    return (b"[" + b",".join(items) + b"]").decode("utf-8")
+
+
+def sse_frame(event: str, payload: bytes, entry_id: Optional[str] = None) -> bytes:
+    """SSE wire format around an encoded payload (orjson never emits raw newlines)."""
+    id_line = f"id: {entry_id}\n".encode() if entry_id else b""
+    return id_line + b"event: " + event.encode() + b"\ndata: " + payload + b"\n\n"
+
+
+class StreamBroker(ABC):
+    """
+    Per-job bounded event streams with ordered entry ids. Producers publish; any number
+    of readers poll with read(), passing the id of the last entry they have seen.
+    """
+
+    # Whether other processes publish to and read from the same streams
+    shared = False
+
+    @abstractmethod
+    async def open(self, job_id: str):
+        """Creates the job's empty stream (no-op if it exists) so readers can find it before its first event."""
+
+    @abstractmethod
+    async def exists(self, job_id: str) -> bool:
+        """True while the broker holds the job's stream."""
+
+    @abstractmethod
+    async def publish(self, job_id: str, event: str, payload: bytes) -> Optional[str]:
+        """Appends an event with its JSON-encoded data and returns the new entry id, or None if the stream is unknown."""
+
+    @abstractmethod
+    async def delete(self, job_id: str, entry_ids: List[str], lossy: bool):
+        """
+        Removes entries from the buffer. lossy=False means they were superseded by newer events
+        (replay stays complete); lossy=True means readers behind them must resync.
+        """
+
+    @abstractmethod
+    async def read(self, job_id: str, after_id: Optional[str], timeout: float) -> List[StreamEntry]:
+        """Entries after after_id (all entries when None), waiting up to timeout seconds for new ones."""
+
+    @abstractmethod
+    async def missed(self, job_id: str, after_id: Optional[str]) -> bool:
+        """True when entries after after_id were already dropped from the buffer, so replay would have a gap."""
+
+    @abstractmethod
+    async def set_snapshot(self, job_id: str, version: int, payload: bytes):
+        """Stores the encoded snapshot of the latest full content document, sent to clients that connect or resync."""
+
+    @abstractmethod
+    async def get_snapshot(self, job_id: str) -> Optional[Tuple[int, bytes]]:
+        """The (version, payload) last stored by set_snapshot(), or None."""
+
+    def valid_id(self, entry_id: str) -> bool:
+        """True if entry_id has the form of this broker's entry ids (for ids supplied by clients)."""
+        return bool(_STREAM_ID_PATTERN.fullmatch(entry_id))
+
+    async def finish(self, job_id: str):
+        """Called once the job has published its final event."""
+
+    @abstractmethod
+    async def discard(self, job_id: str):
+        """Drops everything held for the job (called by StreamLifecycle on eviction)."""
+
+    async def aclose(self):
+        pass
+
+
+class MemoryBroker(StreamBroker):
+    """In-process broker: only the worker that runs the job can serve its stream. Also the local stand-in for tests."""
+
+    def __init__(self):
+        self._logs: Dict[str, OrderedDict] = {}
+        self._last_seq: Dict[str, int] = {}
+        self._lost_seq: Dict[str, int] = {}
+        self._snapshots: Dict[str, Tuple[int, bytes]] = {}
+        self._signals: Dict[str, asyncio.Event] = {}
+
+    async def open(self, job_id: str):
+        if job_id not in self._logs:
+            self._logs[job_id] = OrderedDict()
+            self._last_seq[job_id] = 0
+            self._lost_seq[job_id] = 0
+            self._signals[job_id] = asyncio.Event()
+
+    async def exists(self, job_id: str) -> bool:
+        return job_id in self._logs
+
+    def valid_id(self, entry_id: str) -> bool:
+        return bool(_SEQ_ID_PATTERN.fullmatch(entry_id))
+
+    async def publish(self, job_id: str, event: str, payload: bytes) -> Optional[str]:
+        log = self._logs.get(job_id)
+        if log is None:
+            return None
+        seq = self._last_seq[job_id] + 1
+        self._last_seq[job_id] = seq
+        log[seq] = (event, payload)
+        # Wake every waiting reader, then arm a fresh signal for the next publish
+        signal = self._signals[job_id]
+        self._signals[job_id] = asyncio.Event()
+        signal.set()
+        return str(seq)
+
+    async def read(self, job_id: str, after_id: Optional[str], timeout: float) -> List[StreamEntry]:
+        if job_id not in self._logs:
+            return []
+        after = int(after_id or 0)
+        if self._last_seq[job_id] <= after:
+            try:
+                await asyncio.wait_for(self._signals[job_id].wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return []
+        return [(str(seq), event, payload) for seq, (event, payload) in self._logs.get(job_id, {}).items() if seq > after]
+
+    async def delete(self, job_id: str, entry_ids: List[str], lossy: bool):
+        log = self._logs.get(job_id)
+        if log is None:
+            return
+        for entry_id in entry_ids:
+            log.pop(int(entry_id), None)
+        if lossy and entry_ids:
+            self._lost_seq[job_id] = max(self._lost_seq[job_id], *(int(i) for i in entry_ids))
+
+    async def missed(self, job_id: str, after_id: Optional[str]) -> bool:
+        return self._lost_seq.get(job_id, 0) > int(after_id or 0)
+
+    async def set_snapshot(self, job_id: str, version: int, payload: bytes):
+        if job_id in self._logs:
+            self._snapshots[job_id] = (version, payload)
+
+    async def get_snapshot(self, job_id: str) -> Optional[Tuple[int, bytes]]:
+        return self._snapshots.get(job_id)
+
+    async def discard(self, job_id: str):
+        self._logs.pop(job_id, None)
+        self._last_seq.pop(job_id, None)
+        self._lost_seq.pop(job_id, None)
+        self._snapshots.pop(job_id, None)
+        self._signals.pop(job_id, None)
+
+
+class RedisBroker(StreamBroker):
+    """Redis Streams broker (XADD/XREAD): the job can run on one worker and be streamed from any other."""
+
+    shared = True
+
+    def __init__(self, url: str, key_prefix: str = "blogstream:"):
+        # Payloads stay as bytes end to end; only ids are decoded
+        self._redis = aioredis.from_url(url, decode_responses=False)
+        self._prefix = key_prefix
+
+    def _key(self, job_id: str) -> str:
+        return f"{self._prefix}{job_id}"
+
+    async def open(self, job_id: str):
+        # Create an empty stream so readers on other workers can tell the job exists before its first event
+        key = self._key(job_id)
+        if await self._redis.exists(key):
+            # Reopened by the worker that claimed the job (or reclaimed it): keep what readers may still replay,
+            # and restart the expiry that began when the job was announced, however long it sat in the queue
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for suffix in ("", ":lost", ":snapshot"):
+                    pipe.expire(f"{key}{suffix}", STREAM_MAX_AGE)
+                await pipe.execute()
+            return
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.xadd(key, {"event": "", "data": b""})
+            pipe.xtrim(key, maxlen=0, approximate=False)
+            pipe.expire(key, STREAM_MAX_AGE)
+            await pipe.execute()
+
+    async def exists(self, job_id: str) -> bool:
+        return bool(await self._redis.exists(self._key(job_id)))
+
+    async def publish(self, job_id: str, event: str, payload: bytes) -> Optional[str]:
+        # nomkstream: never recreate (without a TTL) a stream that was discarded or expired
+        entry_id = await self._redis.xadd(self._key(job_id), {"event": event, "data": payload}, nomkstream=True)
+        return entry_id.decode() if entry_id else None
+
+    async def delete(self, job_id: str, entry_ids: List[str], lossy: bool):
+        if not entry_ids:
+            return
+        key = self._key(job_id)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.xdel(key, *entry_ids)
+            if lossy:
+                # Newest lost id, kept beside the stream; XDEL's own bookkeeping can't tell superseded from lost
+                pipe.set(f"{key}:lost", max(entry_ids, key=_parse_stream_id), ex=STREAM_MAX_AGE)
+            await pipe.execute()
+
+    async def read(self, job_id: str, after_id: Optional[str], timeout: float) -> List[StreamEntry]:
+        block = int(timeout * 1000) if timeout > 0 else None
+        response = await self._redis.xread({self._key(job_id): after_id or "0-0"}, block=block)
+        if not response:
+            return []
+        _, entries = response[0]
+        return [(entry_id.decode(), fields[b"event"].decode(), fields[b"data"]) for entry_id, fields in entries]
+
+    async def missed(self, job_id: str, after_id: Optional[str]) -> bool:
+        lost = await self._redis.get(f"{self._key(job_id)}:lost")
+        return lost is not None and _parse_stream_id(lost.decode()) > _parse_stream_id(after_id or "0-0")
+
+    async def set_snapshot(self, job_id: str, version: int, payload: bytes):
+        await self._redis.set(f"{self._key(job_id)}:snapshot", str(version).encode() + b"\n" + payload, ex=STREAM_MAX_AGE)
+
+    async def get_snapshot(self, job_id: str) -> Optional[Tuple[int, bytes]]:
+        raw = await self._redis.get(f"{self._key(job_id)}:snapshot")
+        if not raw:
+            return None
+        version, _, payload = raw.partition(b"\n")
+        return int(version), payload
+
+    async def finish(self, job_id: str):
+        key = self._key(job_id)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for suffix in ("", ":lost", ":snapshot"):
+                pipe.expire(f"{key}{suffix}", STREAM_RETENTION)
+            await pipe.execute()
+
+    async def discard(self, job_id: str):
+        key = self._key(job_id)
+        await self._redis.delete(key, f"{key}:lost", f"{key}:snapshot")
+
+    async def aclose(self):
+        await self._redis.aclose()
+
+
+def _parse_stream_id(entry_id: str) -> Tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms or 0), int(seq or 0)
+
+
+def create_broker(url: str = STREAM_BROKER_URL) -> StreamBroker:
+    if url.startswith("memory://"):
+        return MemoryBroker()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    raise ValueError(f"Unsupported STREAM_BROKER_URL '{url}'. Use memory:// or redis://.")
+
+
+def content_delta(old: str, new: str) -> dict:
+    """
+    Smallest single splice turning old into new: replace old[at:at+remove] with text.
+    Growing drafts are pure appends (at == len(old), remove == 0).
+    """
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[len(old) - 1 - suffix] == new[len(new) - 1 - suffix]:
+        suffix += 1
+    return {"at": prefix, "remove": len(old) - prefix - suffix, "text": new[prefix:len(new) - suffix]}
+
+
+class _JobBuffer:
+    """
+    Producer-side state of a job's stream: what it currently has buffered in the broker
+    (event kind and size per entry), its content snapshot, and when it was last active.
+    """
+
+    def __init__(self, claimed: bool = True):
+        # False while the job is only announced (queued): no worker here publishes to it yet
+        self.claimed = claimed
+        self.entries: "OrderedDict[str, Tuple[str, Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.coalesced = 0
+        self.evicted = 0
+        self.content = ""
+        self.content_version = 0
+        self.snapshot_bytes = 0
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+        self.finished_at: Optional[float] = None
+
+    @property
+    def held_bytes(self) -> int:
+        return self.bytes + self.snapshot_bytes
+
+    def add(self, entry_id: str, event: str, key: Any, size: int):
+        self.entries[entry_id] = (event, key, size)
+        self.bytes += size
+
+    def remove(self, entry_ids: List[str]):
+        for entry_id in entry_ids:
+            _, _, size = self.entries.pop(entry_id)
+            self.bytes -= size
+
+    def ids(self, event: str, key: Any = None) -> List[str]:
+        return [i for i, (e, k, _) in self.entries.items() if e == event and (key is None or k == key)]
+
+
+class StreamLifecycle:
+    """
+    Tracks every stream this worker publishes and evicts it from the broker once it is no longer
+    useful: finished streams after STREAM_RETENTION, streams that stopped receiving events (the job
+    crashed or was abandoned) after STREAM_IDLE_TTL, and, whenever the streams together hold more than
+    STREAM_MAX_BYTES, finished then least recently active streams until they fit. Eviction happens
+    whether or not a client ever connected.
+    """
+
+    def __init__(self, broker: StreamBroker, idle_ttl: float = STREAM_IDLE_TTL, retention: float = STREAM_RETENTION,
+                 max_bytes: int = STREAM_MAX_BYTES, sweep_interval: float = STREAM_SWEEP_INTERVAL):
+        self.broker = broker
+        self.idle_ttl = idle_ttl
+        self.retention = retention
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.jobs: Dict[str, _JobBuffer] = {}
+        self.evictions = {"finished": 0, "idle": 0, "memory_cap": 0}
+        self._evicted: "OrderedDict[str, None]" = OrderedDict()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def announce(self, job_id: str):
+        """Opens a queued job's stream for readers; the idle TTL evicts it if no worker here ever claims it."""
+        if job_id in self.jobs:
+            return
+        self._start()
+        self._evicted.pop(job_id, None)
+        await self.broker.open(job_id)
+        self.jobs[job_id] = _JobBuffer(claimed=False)
+
+    async def open(self, job_id: str) -> _JobBuffer:
+        """Starts publishing the job's stream from this worker (it claimed the job)."""
+        self._start()
+        self._evicted.pop(job_id, None)
+        await self.broker.open(job_id)
+        buffer = self.jobs.get(job_id)
+        if buffer is None or buffer.finished_at is not None:
+            buffer = self.jobs[job_id] = _JobBuffer()
+            snapshot = await self.broker.get_snapshot(job_id)
+            if snapshot:
+                # Reclaimed after an earlier attempt published content: keep counting from the version readers hold
+                buffer.content_version, payload = snapshot
+                buffer.content = orjson.loads(payload)["text"]
+                buffer.snapshot_bytes = len(payload)
+        buffer.claimed = True
+        buffer.last_active = time.monotonic()
+        await self._enforce_cap()
+        return buffer
+
+    def _start(self):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    def announced(self) -> List[str]:
+        """Queued jobs whose streams this process opened and no worker here has claimed yet."""
+        return [job_id for job_id, b in self.jobs.items() if not b.claimed and b.finished_at is None]
+
+    def evicted(self, job_id: str) -> bool:
+        """True if this worker evicted the job's stream (and nothing has reopened it since)."""
+        return job_id in self._evicted
+
+    def active(self, job_id: str) -> Optional[_JobBuffer]:
+        """The job's state while it is still publishing, else None."""
+        buffer = self.jobs.get(job_id)
+        return buffer if buffer is not None and buffer.finished_at is None else None
+
+    async def finish(self, job_id: str):
+        await self.broker.finish(job_id)
+        buffer = self.jobs.get(job_id)
+        if buffer is not None:
+            buffer.finished_at = time.monotonic()
+            # The broker keeps the snapshot for late readers; the producer no longer diffs against it
+            buffer.content = ""
+
+    async def sweep(self, now: Optional[float] = None) -> int:
+        """Evicts expired streams, then enforces the memory cap. Returns how many streams were evicted."""
+        now = time.monotonic() if now is None else now
+        expired = []
+        for job_id, buffer in self.jobs.items():
+            if buffer.finished_at is not None:
+                if now - buffer.finished_at >= self.retention:
+                    expired.append((job_id, "finished"))
+            elif now - buffer.last_active >= self.idle_ttl:
+                expired.append((job_id, "idle"))
+        for job_id, reason in expired:
+            await self._evict(job_id, reason)
+        return len(expired) + await self._enforce_cap()
+
+    async def _enforce_cap(self) -> int:
+        held = sum(b.held_bytes for b in self.jobs.values())
+        if held <= self.max_bytes:
+            return 0
+        # Finished streams first (oldest first), then running ones by least recent activity
+        victims = sorted(
+            self.jobs.items(),
+            key=lambda item: (item[1].finished_at is None, item[1].finished_at or item[1].last_active),
+        )
+        evicted = 0
+        for job_id, buffer in victims:
+            if held <= self.max_bytes:
+                break
+            held -= buffer.held_bytes
+            await self._evict(job_id, "memory_cap")
+            evicted += 1
+        return evicted
+
+    async def _evict(self, job_id: str, reason: str):
+        buffer = self.jobs.pop(job_id, None)
+        if buffer is None:
+            return
+        if not buffer.claimed and self.broker.shared:
+            # Announced here but possibly claimed by a worker elsewhere, which tracks the stream itself;
+            # otherwise the broker's own expiry (STREAM_MAX_AGE) removes it
+            return
+        self.evictions[reason] += 1
+        self._evicted[job_id] = None
+        if len(self._evicted) > _EVICTED_HISTORY:
+            self._evicted.popitem(last=False)
+        if reason != "finished":
+            logger.warning(f"Worker {os.getpid()} - Evicting stream for job {job_id} ({reason}, {buffer.held_bytes} bytes).")
+        try:
+            await self.broker.discard(job_id)
+        except Exception as e:
+            logger.error(f"Failed to discard stream for job {job_id}: {e}")
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Stream sweep failed: {e}")
+
+    def stats(self) -> dict:
+        """Counts and bytes held by the streams this worker publishes."""
+        now = time.monotonic()
+        per_job = {
+            job_id: {
+                "state": "finished" if b.finished_at is not None else "active" if b.claimed else "queued",
+                "events": len(b.entries),
+                "bytes": b.held_bytes,
+                "coalesced": b.coalesced,
+                "evicted": b.evicted,
+                "idle_seconds": round(now - b.last_active, 1),
+            }
+            for job_id, b in self.jobs.items()
+        }
+        return {
+            "streams": len(per_job),
+            "active_jobs": sum(1 for j in per_job.values() if j["state"] == "active"),
+            "finished_jobs": sum(1 for j in per_job.values() if j["state"] == "finished"),
+            "buffered_events": sum(j["events"] for j in per_job.values()),
+            "buffered_bytes": sum(j["bytes"] for j in per_job.values()),
+            "max_bytes": self.max_bytes,
+            "idle_ttl_seconds": self.idle_ttl,
+            "retention_seconds": self.retention,
+            "stream_evictions": dict(self.evictions),
+            "per_job": per_job,
+        }
+
+    async def aclose(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+
+
+class _Frame:
+    """One event rendered to SSE once, shared by every subscriber of the job on this worker."""
+
+    __slots__ = ("entry_id", "order", "event", "content_version", "payload", "data")
+
+    def __init__(self, event: str, payload: bytes, entry_id: Optional[str] = None, content_version: Optional[int] = None):
+        self.entry_id = entry_id
+        self.order = _parse_stream_id(entry_id) if entry_id else (0, 0)
+        self.event = event
+        if content_version is None:
+            data = orjson.loads(payload) if event == "content" else None
+            content_version = data.get("version", 0) if isinstance(data, dict) else 0
+        self.content_version = content_version
+        self.payload = payload
+        self.data = sse_frame(event, payload, entry_id)
+
+    def envelope(self, job_id: str) -> str:
+        """The event as one JSON message tagged with its job, for multiplexed (WebSocket) delivery."""
+        return (
+            b'{"job_id":' + encode_json(job_id) + b',"id":' + encode_json(self.entry_id)
+            + b',"event":' + encode_json(self.event) + b',"data":' + self.payload + b"}"
+        ).decode("utf-8")
+
+
+class _JobFeed:
+    """A job's recent frames on this worker, filled by a single broker reader and read by many subscribers."""
+
+    def __init__(self, window: int):
+        self.frames: deque = deque(maxlen=window)
+        self.dropped = 0  # frames that have rolled out of the window
+        self.cursor: Optional[str] = None
+        self.subscribers = 0
+        self.ended = False
+        self.signal = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def head(self) -> int:
+        return self.dropped + len(self.frames)
+
+    def append(self, frame: _Frame):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append(frame)
+
+    def position_after(self, entry_id: Optional[str]) -> Optional[int]:
+        """Absolute index of the first frame after entry_id, or None if the window no longer reaches back that far."""
+        if entry_id is None:
+            return 0 if self.dropped == 0 else None
+        order = _parse_stream_id(entry_id)
+        if self.dropped and self.frames and self.frames[0].order > order:
+            return None
+        for i, frame in enumerate(self.frames):
+            if frame.order > order:
+                return self.dropped + i
+        return self.head
+
+
+class StreamHub:
+    """
+    Fans a job's events out to every subscriber on this worker. One task per watched job reads
+    the broker and renders each event once; subscribers keep their own cursor into that shared
+    window of STREAM_HUB_WINDOW events. A subscriber that falls behind the window reads from the
+    broker directly until it catches up; one that falls behind the broker's replay buffer is
+    disconnected so its client reconnects and resyncs.
+    """
+
+    def __init__(self, broker: StreamBroker, window: int = STREAM_HUB_WINDOW):
+        self.broker = broker
+        self.window = window
+        self._feeds: Dict[str, _JobFeed] = {}
+        self.catch_up_reads = 0
+        self.lag_disconnects = 0
+
+    async def subscribe(self, job_id: str, cursor: Optional[str]):
+        feed = self._feeds.get(job_id)
+        if feed is None:
+            feed = self._feeds[job_id] = _JobFeed(self.window)
+            feed.task = asyncio.create_task(self._pump(job_id, feed))
+        feed.subscribers += 1
+        position: Optional[int] = None
+        try:
+            while True:
+                if position is None or position < feed.dropped:
+                    position = feed.position_after(cursor)
+                if position is None:
+                    # Behind the shared window: read straight from the broker until we are back inside it.
+                    # Past the broker's own buffer there is nothing left to replay; disconnect so the client
+                    # reconnects with Last-Event-ID and gets a resync.
+                    if await self.broker.missed(job_id, cursor):
+                        self.lag_disconnects += 1
+                        logger.warning(f"Worker {os.getpid()} - Subscriber of job {job_id} lagged past the replay buffer; disconnecting.")
+                        return
+                    entries = await self.broker.read(job_id, cursor, timeout=0)
+                    if not entries:
+                        position = feed.dropped
+                        continue
+                    self.catch_up_reads += 1
+                    for entry_id, event, payload in entries[:self.window]:
+                        frame = _Frame(event, payload, entry_id)
+                        cursor = entry_id
+                        yield frame
+                        if frame.event == "end":
+                            return
+                    continue
+                if position < feed.head:
+                    frame = feed.frames[position - feed.dropped]
+                    position += 1
+                    if cursor is not None and frame.order <= _parse_stream_id(cursor):
+                        # A feed started for this subscriber loads the job's history, which the cursor may already cover
+                        continue
+                    cursor = frame.entry_id
+                    yield frame
+                    if frame.event == "end":
+                        return
+                    continue
+                if feed.ended:
+                    return
+                try:
+                    await asyncio.wait_for(feed.signal.wait(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if feed.task.done() and not feed.ended:
+                        logger.warning(f"Worker {os.getpid()} - Stream for job {job_id} expired before it ended.")
+                        return
+                    # Send heartbeat to keep connection alive and bypass proxy buffering
+                    yield _Frame("ping", encode_json({"time": datetime.utcnow().isoformat()}))
+        finally:
+            feed.subscribers -= 1
+            if feed.subscribers == 0:
+                feed.task.cancel()
+                if self._feeds.get(job_id) is feed:
+                    del self._feeds[job_id]
+
+    async def _pump(self, job_id: str, feed: _JobFeed):
+        while not feed.ended:
+            entries = await self.broker.read(job_id, feed.cursor, timeout=STREAM_HEARTBEAT_SECONDS)
+            if not entries:
+                if not await self.broker.exists(job_id):
+                    return
+                continue
+            for entry_id, event, payload in entries:
+                feed.cursor = entry_id
+                frame = _Frame(event, payload, entry_id)
+                feed.append(frame)
+                if frame.event == "end":
+                    feed.ended = True
+            # Wake every waiting subscriber, then arm a fresh signal
+            signal, feed.signal = feed.signal, asyncio.Event()
+            signal.set()
+
+    def stats(self) -> dict:
+        return {
+            "watched_jobs": len(self._feeds),
+            "subscribers": sum(f.subscribers for f in self._feeds.values()),
+            "per_job_subscribers": {job_id: f.subscribers for job_id, f in self._feeds.items()},
+            "catch_up_reads": self.catch_up_reads,
+            "lag_disconnects": self.lag_disconnects,
+        }
+
+
+class StreamManager:
+    """
+    Publishes job events to the configured broker and renders them as SSE for clients.
+    Each job's buffer is kept bounded: snapshot events replace earlier ones, thoughts are
+    capped, finished sections drop their deltas, and overflow evicts the oldest events
+    that are not protected (end, error, ...). Whole streams are evicted by StreamLifecycle.
+    """
+
+    def __init__(self, broker: StreamBroker = None, buffer_size: int = STREAM_BUFFER_SIZE,
+                 max_thoughts: int = STREAM_MAX_THOUGHTS):
+        self.broker = broker or create_broker()
+        self.buffer_size = buffer_size
+        self.max_thoughts = max_thoughts
+        self.lifecycle = StreamLifecycle(self.broker)
+        self.hub = StreamHub(self.broker)
+
+    async def announce(self, job_id: str):
+        """Opens the job's stream for readers before any worker has claimed the job (the claimer calls create())."""
+        await self.lifecycle.announce(job_id)
+
+    async def create(self, job_id: str):
+        """Starts publishing the job's stream from this process."""
+        await self.lifecycle.open(job_id)
+        if await self.broker.read(job_id, None, timeout=0):
+            # Reclaimed: clients drop the earlier attempt's section drafts; content continues from its snapshot
+            await self.push(job_id, "resync", {"reason": "restarted"})
+
+    async def push(self, job_id: str, event: str, data: Any) -> Optional[bytes]:
+        """
+        Encodes the event once and publishes it. Returns the JSON bytes of the data so callers can
+        persist the same encoding (content events return their delta; None if nothing changed).
+        """
+        if self.lifecycle.evicted(job_id):
+            # Evicted while the job was still running (idle TTL or memory cap): its viewers were already cut off
+            return None
+        buffer = self.lifecycle.active(job_id)
+        if event == "content" and isinstance(data, str) and buffer is not None:
+            data = await self._encode_content(job_id, buffer, data)
+            if data is None:
+                return None
+        payload = encode_json(data)
+        entry_id = await self.broker.publish(job_id, event, payload)
+        if entry_id is not None and buffer is not None:
+            buffer.last_active = time.monotonic()
+            await self._coalesce(job_id, buffer, entry_id, event, data, len(payload))
+        if event == "end":
+            await self.lifecycle.finish(job_id)
+        return payload
+
+    async def _encode_content(self, job_id: str, buffer: _JobBuffer, content: str) -> Optional[dict]:
+        """Turns a full content document into a versioned delta against the previous one (None if unchanged)."""
+        if content == buffer.content:
+            return None
+        delta = content_delta(buffer.content, content)
+        op = "append" if delta["remove"] == 0 and delta["at"] == len(buffer.content) else "patch"
+        buffer.content = content
+        buffer.content_version += 1
+        snapshot = encode_json({"op": "snapshot", "version": buffer.content_version, "text": content})
+        buffer.snapshot_bytes = len(snapshot)
+        await self.broker.set_snapshot(job_id, buffer.content_version, snapshot)
+        return {"op": op, "version": buffer.content_version, "base": buffer.content_version - 1, **delta}
+
+    async def _coalesce(self, job_id: str, buffer: _JobBuffer, entry_id: str, event: str, data: Any, size: int):
+        key = data.get("task_id") if event in ("section_delta", "section_appended") and isinstance(data, dict) else None
+        superseded: List[str] = []
+        if event in SNAPSHOT_EVENTS:
+            superseded = buffer.ids(event)
+        elif event == "section_appended":
+            # The merged content snapshot now contains this section
+            superseded = buffer.ids("section_delta", key)
+        buffer.add(entry_id, event, key, size)
+        if event == "thought":
+            thoughts = buffer.ids("thought")
+            superseded = thoughts[:max(0, len(thoughts) - self.max_thoughts)]
+        if superseded:
+            buffer.remove(superseded)
+            buffer.coalesced += len(superseded)
+            await self.broker.delete(job_id, superseded, lossy=False)
+
+        overflow = len(buffer.entries) - self.buffer_size
+        if overflow > 0:
+            low_value = [i for i, (e, _, _) in buffer.entries.items() if e in LOW_VALUE_EVENTS]
+            other = [i for i, (e, _, _) in buffer.entries.items() if e not in LOW_VALUE_EVENTS | PROTECTED_EVENTS]
+            evicted = (low_value + other)[:overflow]
+            if evicted:
+                buffer.remove(evicted)
+                buffer.evicted += len(evicted)
+                await self.broker.delete(job_id, evicted, lossy=True)
+
+    def valid_event_id(self, entry_id: Any) -> bool:
+        """True if a client-supplied Last-Event-ID can be resumed from."""
+        return isinstance(entry_id, str) and self.broker.valid_id(entry_id)
+
+    def stats(self) -> dict:
+        """Memory gauge for streams this worker is publishing (counts, bytes, evictions) plus its hub."""
+        return {**self.lifecycle.stats(), "hub": self.hub.stats()}
+
+    async def events(self, job_id: str, last_event_id: Optional[str] = None):
+        """
+        The job's events as frames, for any transport. Each event carries an id so a reconnecting
+        client's Last-Event-ID resumes right after it; if those events already left the buffer, a
+        `resync` event is sent. `content` events are deltas against the previous version; a client
+        that connects fresh or resyncs first gets the full document as a `snapshot` content event.
+        Live events come from the worker's StreamHub, so N viewers of a job share one broker read.
+        """
+        if not await self.broker.exists(job_id):
+            logger.error(f"Worker {os.getpid()} - No stream found for job {job_id}.")
+            yield _Frame("error", encode_json({"message": "Stream not found"}))
+            return
+        if not self.broker.shared and not await self._wait_for_claim(job_id):
+            # Queued, and a worker in another process claimed it (or none here will in time): nothing publishes here
+            logger.warning(f"Worker {os.getpid()} - Job {job_id} was not claimed by this process; its stream is not served here.")
+            yield _Frame("error", encode_json({"message": "Stream not found"}))
+            return
+
+        logger.info(f"Worker {os.getpid()} - Starting stream for job {job_id} (resume after: {last_event_id})")
+        cursor = last_event_id
+        resynced = await self.broker.missed(job_id, cursor)
+        if resynced:
+            logger.warning(f"Worker {os.getpid()} - Replay buffer for job {job_id} no longer covers {cursor}; asking client to resync.")
+            yield _Frame("resync", encode_json({"reason": "buffer_overflow"}))
+        snapshot_version = 0
+        if cursor is None or resynced:
+            snapshot = await self.broker.get_snapshot(job_id)
+            if snapshot:
+                snapshot_version, payload = snapshot
+                yield _Frame("content", payload, content_version=snapshot_version)
+
+        async for frame in self.hub.subscribe(job_id, cursor):
+            if frame.content_version and frame.content_version <= snapshot_version:
+                # Already covered by the snapshot this client started from
+                continue
+            yield frame
+
+    async def _wait_for_claim(self, job_id: str, grace: float = STREAM_CLAIM_GRACE) -> bool:
+        """False if the job is still only announced here after grace seconds (ended streams count as served)."""
+        deadline = time.monotonic() + grace
+        while True:
+            buffer = self.lifecycle.jobs.get(job_id)
+            if buffer is None or buffer.claimed or buffer.finished_at is not None:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+
+    async def generator(self, job_id: str, last_event_id: Optional[str] = None):
+        """SSE stream of the job's events (see events())."""
+        try:
+            async for frame in self.events(job_id, last_event_id):
+                yield frame.data
+        except asyncio.CancelledError:
+            logger.info(f"Worker {os.getpid()} - Client disconnected from stream {job_id}")
+
+    async def aclose(self):
+        await self.lifecycle.aclose()
+        await self.broker.aclose()
+
+
+stream_manager = StreamManager()
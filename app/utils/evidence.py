@@ -0,0 +1,203 @@
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from ..schemas.models import EvidenceItem
+from .tokens import estimate_tokens
+from .relevance import BM25Index
+
+# Query parameters that only track the click and never change the page
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "igshid"}
+_DATE_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes a URL so trivially different links to the same page compare equal.
+    Example: "HTTPS://www.Example.com/post/?utm_source=x#top" -> "https://example.com/post"
+    The scheme is kept so http-only sites stay reachable; dedupe on the result without it.
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    if not parts.netloc:
+        # Scheme-less "example.com/post": urlsplit reads the host as a path (or "host:port" as a scheme)
+        parts = urlsplit("//" + url.strip().lstrip("/"))
+    scheme = (parts.scheme or "https").lower()
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if (scheme, host.rpartition(":")[2]) in {("https", "443"), ("http", "80")}:
+        host = host.rpartition(":")[0]
+    path = parts.path.rstrip("/")
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def parse_published_at(value) -> Optional[datetime]:
+    """Best-effort parse of the date formats search providers return (ISO 8601, RFC 2822, YYYY-MM-DD)."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip()
+        parsed = None
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            try:
+                parsed = parsedate_to_datetime(text)
+            except (TypeError, ValueError):
+                match = _DATE_PATTERN.search(text)
+                if match:
+                    try:
+                        parsed = datetime(*(int(g) for g in match.groups()))
+                    except ValueError:
+                        parsed = None
+        if parsed is None:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def recency_score(published_at, now: Optional[datetime] = None, half_life_days: float = 180.0) -> float:
+    """Scores freshness in [0, 1]: 1.0 for today, halving every half_life_days. Undated items get 0.25."""
+    parsed = parse_published_at(published_at)
+    if parsed is None:
+        return 0.25
+    now = now or datetime.now(timezone.utc)
+    age_days = max(0.0, (now - parsed).total_seconds() / 86400)
+    return 0.5 ** (age_days / half_life_days)
+
+
+def build_evidence(result_lists: List[List[dict]], top_k: int = 12, recency_weight: float = 0.4) -> List[EvidenceItem]:
+    """
+    Turns normalized search results (one list per query, best first) into ranked EvidenceItems
+    without an LLM: canonicalizes and deduplicates URLs, blends search rank with recency, keeps top_k.
+    """
+    now = datetime.now(timezone.utc)
+    best = {}
+    for results in result_lists:
+        for rank, r in enumerate(results):
+            url = canonicalize_url(r.get("url") or "")
+            if not url:
+                continue
+            key = url.split("://", 1)[-1]
+            score = (1 - recency_weight) / (1 + rank) + recency_weight * recency_score(r.get("published_at"), now)
+            current = best.get(key)
+            if current is None or score > current[0]:
+                best[key] = (score, url, r)
+
+    ranked = sorted(best.values(), key=lambda entry: entry[0], reverse=True)[:top_k]
+    evidence = []
+    for _, url, r in ranked:
+        evidence.append(
+            EvidenceItem(
+                title=(r.get("title") or url).strip(),
+                url=url,
+                published_at=r.get("published_at"),
+                snippet=(r.get("snippet") or "").strip() or None,
+                source=r.get("source") or urlsplit(url).netloc,
+            )
+        )
+    return evidence
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0] if " " in text[:max_chars] else text[:max_chars]
+    return cut.rstrip(" ,.;:") + "…"
+
+
+def pack_results(result_lists: List[List[dict]], token_budget: int = 3000, max_snippet_chars: int = 600) -> Tuple[str, int]:
+    """
+    Packs normalized search results (one list per query, best first) into a compact prompt block:
+    URLs are deduplicated, sources are ordered by search rank (interleaved across queries), and the
+    snippet budget is split by rank so top results keep more text. Sources that no longer fit are dropped.
+    Returns (text, estimated_tokens).
+    """
+    entries = []
+    seen = set()
+    depth = max((len(results) for results in result_lists), default=0)
+    for rank in range(depth):
+        for results in result_lists:
+            if rank >= len(results):
+                continue
+            r = results[rank]
+            url = canonicalize_url(r.get("url") or "")
+            key = url.split("://", 1)[-1]
+            if not url or key in seen:
+                continue
+            seen.add(key)
+            snippet = " ".join((r.get("snippet") or "").split())
+            entries.append((rank, url, r, snippet))
+
+    weights = [1 / (1 + rank) for rank, _, _, _ in entries]
+    total_weight = sum(weights)
+    headers = []
+    for i, (_, url, r, _) in enumerate(entries, start=1):
+        header = f"[{i}] {' '.join((r.get('title') or url).split())} | {url}"
+        if r.get("published_at"):
+            header += f" | {r['published_at']}"
+        headers.append(header)
+
+    blocks = []
+    used = 0
+    for header, weight, (_, _, _, snippet) in zip(headers, weights, entries):
+        cost = estimate_tokens(header) + 1
+        if used + cost > token_budget:
+            break
+        snippet_budget = max(0, int(token_budget * weight / total_weight) - cost)
+        snippet = _truncate(snippet, min(max_snippet_chars, snippet_budget * 4))
+        block = f"{header}\n{snippet}" if snippet else header
+        block_tokens = estimate_tokens(block) + 1
+        if used + block_tokens > token_budget:
+            block, block_tokens = header, cost
+        blocks.append(block)
+        used += block_tokens
+
+    text = "\n".join(blocks)
+    return text, estimate_tokens(text)
+
+
+def rank_evidence(query: str, evidence: List[EvidenceItem], top_n: int = 16, recency_weight: float = 0.3) -> List[EvidenceItem]:
+    """
+    Orders evidence by BM25 relevance of title and snippet to the query, blended with recency,
+    and keeps the best top_n. Relevance is scaled to [0, 1] by the best match.
+    """
+    if not evidence:
+        return []
+    now = datetime.now(timezone.utc)
+    relevance = BM25Index([f"{e.title} {e.snippet or ''}" for e in evidence]).scores(query)
+    best = max(relevance) or 1.0
+    scores = [
+        (1 - recency_weight) * rel / best + recency_weight * recency_score(e.published_at, now)
+        for e, rel in zip(evidence, relevance)
+    ]
+    order = sorted(range(len(evidence)), key=lambda i: (-scores[i], i))[:top_n]
+    return [evidence[i] for i in order]
+
+
+def render_evidence(evidence: List[EvidenceItem], token_budget: int = 1500, max_snippet_chars: int = 300) -> str:
+    """Renders evidence in order as compact '[n] title | url | date' blocks, stopping at the token budget."""
+    blocks = []
+    used = 0
+    for i, e in enumerate(evidence, start=1):
+        header = f"[{i}] {' '.join(e.title.split())} | {e.url}"
+        if e.published_at:
+            header += f" | {e.published_at}"
+        snippet = _truncate(" ".join((e.snippet or "").split()), max_snippet_chars)
+        block = f"{header}\n{snippet}" if snippet else header
+        cost = estimate_tokens(block) + 1
+        if used + cost > token_budget:
+            break
+        blocks.append(block)
+        used += cost
+    return "\n".join(blocks)
@@ -0,0 +1,46 @@
+from typing import List, Tuple
+from .relevance import tokenize
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lowercases and collapses whitespace so trivially different queries compare equal. Punctuation is
+    kept: "c++ memory model" and "c memory model" must not share a cache entry.
+    """
+    return " ".join((query or "").lower().split())
+
+
+def token_set_similarity(a: set, b: set) -> float:
+    """Jaccard overlap of two token sets (1.0 when both are empty)."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _near_duplicate(a: set, b: set, similarity: float) -> bool:
+    # "c++ memory model" and "c memory model" overlap almost entirely but ask about different things
+    if {t for t in a if not t.isalnum()} != {t for t in b if not t.isalnum()}:
+        return False
+    return token_set_similarity(a, b) >= similarity
+
+
+def plan_queries(queries: List[str], max_queries: int = 6, similarity: float = 0.8) -> Tuple[List[str], int]:
+    """
+    Drops blank queries and near-duplicates (token-set similarity >= `similarity` with an earlier one and
+    the same symbol-bearing terms such as "c++" or "3.11"), then caps the list at max_queries. Router order is treated as priority.
+    Returns (kept_queries, number_of_queries_saved).
+    """
+    kept: List[str] = []
+    kept_tokens: List[set] = []
+    for query in queries or []:
+        text = " ".join((query or "").split())
+        if not normalize_query(text):
+            continue
+        tokens = set(tokenize(text, keep_symbols=True)) or {normalize_query(text)}
+        if any(_near_duplicate(tokens, other, similarity) for other in kept_tokens):
+            continue
+        kept.append(text)
+        kept_tokens.append(tokens)
+
+    kept = kept[:max_queries]
+    return kept, len(queries or []) - len(kept)
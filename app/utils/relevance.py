@@ -0,0 +1,57 @@
+import math
+import re
+from collections import Counter
+from typing import List
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Keeps symbols that change what a term means inside it: "c++", "c#", "node.js", "3.11"
+_SYMBOL_TOKEN_PATTERN = re.compile(r"[a-z0-9](?:[a-z0-9.+#]*[a-z0-9+#])?")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "into", "is", "it",
+    "its", "of", "on", "or", "that", "the", "their", "this", "to", "vs", "what", "when", "why", "with",
+}
+
+
+def tokenize(text: str, keep_symbols: bool = False) -> List[str]:
+    """Lowercase alphanumeric tokens without common stopwords (keep_symbols: "c++" stays distinct from "c")."""
+    pattern = _SYMBOL_TOKEN_PATTERN if keep_symbols else _TOKEN_PATTERN
+    return [t for t in pattern.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Small in-memory Okapi BM25 index for ranking a handful of short documents
+    (evidence titles and snippets) against free-text queries.
+    """
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._doc_terms = [Counter(tokenize(doc)) for doc in documents]
+        self._doc_lengths = [sum(terms.values()) for terms in self._doc_terms]
+        self._avg_length = (sum(self._doc_lengths) / len(self._doc_lengths)) if documents else 0.0
+
+        doc_freq = Counter()
+        for terms in self._doc_terms:
+            doc_freq.update(terms.keys())
+        n = len(documents)
+        self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    def scores(self, query: str) -> List[float]:
+        query_terms = set(tokenize(query))
+        results = []
+        for terms, length in zip(self._doc_terms, self._doc_lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_length) if self._avg_length else self.k1
+            for term in query_terms:
+                tf = terms.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+    def top_k(self, query: str, k: int) -> List[int]:
+        """Indices of the k best-matching documents with a non-zero score, best first."""
+        scored = [(score, i) for i, score in enumerate(self.scores(query)) if score > 0]
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [i for _, i in scored[:k]]
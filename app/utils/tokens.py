@@ -0,0 +1,14 @@
+import math
+
+# Average characters per token for English prose with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (no tokenizer download needed).
+    Example: estimate_tokens("hello world!") -> 3
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
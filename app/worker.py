@@ -0,0 +1,307 @@
+"""
+Generation worker: claims queued blog jobs from the database and runs the workflow.
+
+The API only enqueues jobs (a `blog` row with status "queued"); any number of worker
+processes claim them, so generation capacity scales separately from the API. Claims take
+a lease that the worker renews while the job runs; if the worker dies, another one reclaims
+the job once the lease expires. On shutdown, running jobs go back to the queue.
+
+Usage:
+    python -m app.worker --concurrency 4
+
+API processes also run an embedded worker unless JOB_EMBEDDED_WORKER=false.
+"""
+import os
+import json
+import uuid
+import socket
+import signal
+import asyncio
+import argparse
+from typing import Dict, List, Optional
+from datetime import datetime
+from sqlmodel import select
+from .main import stream_run
+from .database import create_db_and_tables, get_session
+from .migrate import run_migrations
+from .schemas.db_models import Blog
+from .utils.slug import slugify
+from .services.logging_service import logger
+from .services.llm_service import llm_manager
+from .services.stream_service import stream_manager, encode_json, encode_json_array, STREAM_BROKER_URL, STREAM_CLAIM_GRACE
+from .services.search_service import get_search_provider
+from .services.job_queue import JOB_LEASE_SECONDS, claim_job, renew_lease, release_job, fail_exhausted_jobs
+
+# Jobs one worker process runs at a time (replaces the old per-API-process limit of 2)
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+# How often an idle worker checks the queue; new jobs on the same process wake it immediately
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+# Run a worker inside each API process too (simple single-process deployments)
+JOB_EMBEDDED_WORKER = os.getenv("JOB_EMBEDDED_WORKER", "true").lower() == "true"
+
+
+async def generate_blog_task_streaming(job_id: str, topic: str, tone: str):
+    """Runs one claimed job: pushes updates to the StreamManager and persists progress to DB."""
+    logger.info(f"Worker {os.getpid()} - Streaming task started for Job ID: {job_id}")
+    
+    # 1. Update DB to Processing
+    with next(get_session()) as session:
+        db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
+        if db_blog:
+            if db_blog.status == "abandoned":
+                logger.warning(f"Worker {os.getpid()} - Job {job_id} was abandoned before it started.")
+                await stream_manager.push(job_id, "end", {"status": "cancelled"})
+                return
+            db_blog.status = "processing"
+            db_blog.thoughts_json = "[]"
+            db_blog.intermediate_content = ""
+            session.add(db_blog)
+            session.commit()
+
+    try:
+        final_output = {}
+        # Thoughts and snapshot events are kept in the JSON form the stream encoded them in,
+        # so persisting them never re-serializes the whole list or model
+        thought_payloads: List[bytes] = []
+        encoded_events: Dict[str, tuple] = {}
+        current_md = ""
+        
+        # 2. Run the Streaming Workflow
+        async for event_type, event_data in stream_run(topic, tone=tone):
+            # Push to SSE stream (encodes the event once; None if the stream was evicted)
+            payload = await stream_manager.push(job_id, event_type, event_data)
+            if payload is None and event_type != "content":
+                payload = encode_json(event_data)
+
+            # CHECK FOR CANCELLATION (Database-driven for multi-worker support)
+            if event_type == "thought": # Check on every log/thought event
+                # Persist thoughts to DB for polling fallback
+                thought_payloads.append(payload)
+                with next(get_session()) as session:
+                    db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
+                    if db_blog:
+                        if db_blog.status == "abandoned":
+                            logger.warning(f"Worker {os.getpid()} - Detected ABANDONED status for {job_id}. Terminating.")
+                            return
+                        db_blog.thoughts_json = encode_json_array(thought_payloads)
+                        session.add(db_blog)
+                        session.commit()
+            elif event_type in ["plan", "evidence"]:
+                encoded_events[event_type] = (event_data, payload)
+            
+            # Accumulate state data as it arrives
+            if event_type in ["plan", "evidence", "image_specs", "seo"]:
+                final_output[event_type] = event_data
+            elif event_type == "content":
+                current_md = event_data
+                with next(get_session()) as session:
+                    db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
+                    if db_blog:
+                        db_blog.intermediate_content = current_md
+                        session.add(db_blog)
+                        session.commit()
+            elif event_type == "complete":
+                final_output.update(event_data)
+                # Once complete is yielded, we can stop the loop
+                break
+
+        # 3. Process Result (Persistence)
+        if final_output.get("plan") or final_output.get("final"):
+            plan = final_output.get("plan")
+            evidence = final_output.get("evidence", [])
+            image_specs = final_output.get("image_specs", [])
+            seo_data = final_output.get("seo", {})
+            
+            raw_title = "Unknown Title"
+            if plan:
+                raw_title = plan.blog_title if hasattr(plan, "blog_title") else plan.get("blog_title", "Unknown Title")
+            
+            safe_name = slugify(raw_title)
+            download_url = f"/static/blogs/{safe_name}.md"
+            image_urls = [f"/static/images/{spec['filename']}" for spec in image_specs]
+
+            # Serialization logic: reuse the streamed encoding unless `complete` replaced the value
+            def encoded(name: str, value) -> str:
+                streamed = encoded_events.get(name)
+                payload = streamed[1] if streamed and streamed[0] is value else encode_json(value)
+                return payload.decode("utf-8")
+
+            with next(get_session()) as session:
+                db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
+                if db_blog:
+                    # Final check: Don't mark as completed if it was abandoned while we were processing the results
+                    if db_blog.status == "abandoned":
+                        logger.warning(f"Job {job_id} was abandoned at the very end. Skipping completion.")
+                        return
+
+                    db_blog.status = "completed"
+                    db_blog.title = raw_title
+                    db_blog.download_url = download_url
+                    db_blog.plan_json = encoded("plan", plan) if plan else db_blog.plan_json
+                    db_blog.evidence_json = encoded("evidence", evidence) if evidence else db_blog.evidence_json
+                    db_blog.images_json = json.dumps(image_urls) if image_urls else db_blog.images_json
+                    db_blog.meta_description = seo_data.get("meta_description") if seo_data else db_blog.meta_description
+                    db_blog.keywords = seo_data.get("keywords") if seo_data else db_blog.keywords
+                    db_blog.thoughts_json = encode_json_array(thought_payloads)
+                    db_blog.updated_at = datetime.utcnow()
+                    session.add(db_blog)
+                    session.commit()
+            
+            await stream_manager.push(job_id, "end", {"status": "completed"})
+        else:
+            with next(get_session()) as session:
+                db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
+                if db_blog and db_blog.status == "completed":
+                    await stream_manager.push(job_id, "end", {"status": "completed"})
+                    return
+            raise Exception("Workflow finished but returned no output.")
+    except asyncio.CancelledError:
+        with next(get_session()) as session:
+            db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
+            user_cancelled = db_blog is not None and db_blog.status == "abandoned"
+        if not user_cancelled:
+            # The worker is shutting down; JobWorker puts the job back in the queue
+            raise
+        # /cancel already marked the job abandoned and refunded the credit
+        logger.warning(f"Worker {os.getpid()} - Job {job_id} was CANCELLED mid-execution.")
+        await stream_manager.push(job_id, "end", {"status": "cancelled"})
+    except Exception as e:
+        logger.error(f"Error in streaming job {job_id}: {str(e)}", exc_info=True)
+        with next(get_session()) as session:
+            db_blog = session.exec(select(Blog).where(Blog.job_id == job_id)).first()
+            if db_blog:
+                db_blog.status = "failed"
+                db_blog.error = str(e)
+                session.add(db_blog)
+                session.commit()
+        await stream_manager.push(job_id, "error", str(e))
+        await stream_manager.push(job_id, "end", {"status": "failed"})
+
+
+class JobWorker:
+    """Claims up to `concurrency` jobs at a time and runs each in its own task, renewing its lease."""
+
+    def __init__(self, concurrency: int = JOB_WORKER_CONCURRENCY, poll_interval: float = JOB_POLL_INTERVAL,
+                 worker_id: Optional[str] = None, prefer_announced: bool = False):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        # Claim jobs whose streams this process announced first, and other processes' jobs only once their
+        # viewers stopped waiting for them (memory:// streams are only served by the process that announced them)
+        self.prefer_announced = prefer_announced
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        # job_id -> task, so /cancel can stop a job running on this process immediately
+        self.running: Dict[str, asyncio.Task] = {}
+        self.claimed = 0
+        self.requeued = 0
+        self._wake = asyncio.Event()
+        self._stopping = False
+
+    def notify(self):
+        """Checks the queue now instead of at the next poll (a job was just enqueued)."""
+        self._wake.set()
+
+    async def run(self):
+        logger.info(f"Job worker {self.worker_id} started (concurrency {self.concurrency}).")
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                await self._reap()
+                while len(self.running) < self.concurrency and not self._stopping:
+                    if self.prefer_announced:
+                        job = await asyncio.to_thread(claim_job, self.worker_id, prefer=stream_manager.lifecycle.announced(),
+                                                      others_after=STREAM_CLAIM_GRACE)
+                    else:
+                        job = await asyncio.to_thread(claim_job, self.worker_id)
+                    if job is None:
+                        break
+                    job_id, topic, tone, _ = job
+                    self.claimed += 1
+                    self.running[job_id] = asyncio.create_task(self._run(job_id, topic, tone))
+            except Exception as e:
+                logger.error(f"Job worker {self.worker_id} failed to poll the queue: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        await asyncio.gather(*self.running.values(), return_exceptions=True)
+        logger.info(f"Job worker {self.worker_id} stopped.")
+
+    async def stop(self):
+        """Stops claiming and hands running jobs back to the queue."""
+        self._stopping = True
+        self._wake.set()
+        tasks = list(self.running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job_id: str, topic: str, tone: str):
+        lease = asyncio.create_task(self._renew(job_id))
+        try:
+            # Publish from this process (idempotent if the API opened the stream here)
+            await stream_manager.create(job_id)
+            await generate_blog_task_streaming(job_id, topic, tone)
+        except asyncio.CancelledError:
+            if await asyncio.to_thread(release_job, job_id, self.worker_id):
+                self.requeued += 1
+                logger.warning(f"Job worker {self.worker_id} returned job {job_id} to the queue.")
+            raise
+        finally:
+            lease.cancel()
+            self.running.pop(job_id, None)
+            self._wake.set()
+
+    async def _renew(self, job_id: str):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            if not await asyncio.to_thread(renew_lease, job_id, self.worker_id):
+                logger.warning(f"Job worker {self.worker_id} no longer holds the lease on job {job_id}.")
+                return
+
+    async def _reap(self):
+        for job_id in await asyncio.to_thread(fail_exhausted_jobs):
+            await stream_manager.push(job_id, "error", "Generation worker stopped responding.")
+            await stream_manager.push(job_id, "end", {"status": "failed"})
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "running": list(self.running),
+            "claimed": self.claimed,
+            "requeued": self.requeued,
+        }
+
+
+# The embedded worker of this process (started by the API unless JOB_EMBEDDED_WORKER=false)
+job_worker = JobWorker(prefer_announced=not stream_manager.broker.shared)
+
+
+async def _serve(worker: JobWorker):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: asyncio.create_task(worker.stop()))
+    try:
+        await worker.run()
+    finally:
+        await llm_manager.aclose()
+        await stream_manager.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY, help="Jobs run at the same time.")
+    parser.add_argument("--poll-interval", type=float, default=JOB_POLL_INTERVAL, help="Seconds between queue checks.")
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    run_migrations()
+    get_search_provider()  # an unknown SEARCH_PROVIDER stops the worker here, not inside every job
+    if STREAM_BROKER_URL.startswith("memory://"):
+        logger.warning("STREAM_BROKER_URL is memory://: live streams from this worker are not visible to API "
+                       "processes; clients fall back to polling. Use a redis:// broker with dedicated workers.")
+    asyncio.run(_serve(JobWorker(args.concurrency, args.poll_interval)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Measures research-stage throughput and search cache effectiveness offline.
+
+Runs simulated jobs through the query planner, the deadline-bounded research
+executor and tavily_search, backed by the fixture search provider with
+configurable latency. Topics repeat across jobs, so later jobs exercise the
+shared search cache. No network calls are made.
+
+Usage:
+    python -m benchmarks.bench_research --jobs 40 --concurrency 8 --topics 10 --latency-ms 300
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+# Keep benchmark cache entries out of the real cache file.
+os.environ.setdefault("CACHE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-research-"), "cache.db"))
+
+from app.services import search_service
+from app.services.search_service import FixtureSearchProvider, set_search_provider, tavily_search
+from app.services.research_service import ResearchExecutor, research_executor_stats
+from app.utils.queries import plan_queries
+
+QUERY_TEMPLATES = [
+    "{topic} overview",
+    "{topic} Overview",
+    "latest {topic} news 2025",
+    "{topic} best practices",
+    "{topic} benchmarks and performance",
+    "common {topic} mistakes",
+]
+
+
+def _job_queries(topic: str) -> list:
+    return [template.format(topic=topic) for template in QUERY_TEMPLATES]
+
+
+async def _run_job(topic: str) -> float:
+    start = time.perf_counter()
+    queries, _ = plan_queries(_job_queries(topic))
+    executor = ResearchExecutor(lambda q: tavily_search(q, max_results=6))
+    await executor.run(queries)
+    return time.perf_counter() - start
+
+
+async def _run(jobs: int, concurrency: int, topics: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    names = [f"topic {i}" for i in range(topics)]
+
+    async def one(i: int):
+        async with semaphore:
+            return await _run_job(random.choice(names))
+
+    return await asyncio.gather(*(one(i) for i in range(jobs)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=40, help="Number of simulated research jobs.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Jobs running at the same time.")
+    parser.add_argument("--topics", type=int, default=10, help="Distinct topics; fewer topics means more cache reuse.")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Mean simulated search latency.")
+    parser.add_argument("--jitter-ms", type=float, default=150, help="Uniform jitter around the mean latency.")
+    parser.add_argument("--fixtures", default=None, help="Optional JSON file mapping queries to stored results.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    set_search_provider(FixtureSearchProvider(args.fixtures, args.latency_ms, args.jitter_ms))
+
+    start = time.perf_counter()
+    timings = asyncio.run(_run(args.jobs, args.concurrency, args.topics))
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(timings)
+    p50_ms = ordered[len(ordered) // 2] * 1000
+    p95_ms = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+    cache = search_service.search_cache.stats()
+    executor = research_executor_stats()
+    print(f"jobs={args.jobs} concurrency={args.concurrency} topics={args.topics} latency={args.latency_ms}±{args.jitter_ms} ms")
+    print(f"throughput      {args.jobs / elapsed:8.2f} jobs/s  ({elapsed:.2f} s total)")
+    print(f"job latency     p50={p50_ms:8.1f} ms  p95={p95_ms:8.1f} ms  max={ordered[-1] * 1000:8.1f} ms")
+    print(f"search cache    hits={cache['hits']} misses={cache['misses']} hit_rate={cache['hit_rate']}")
+    print(f"executor        queries={executor['queries']} hedges={executor['hedges']} timeouts={executor['timeouts']} "
+          f"deadline_hits={executor['deadline_hits']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Compares stream event serialization before and after single-pass encoding.
+
+Replays the events of one simulated job (thoughts, a Plan, EvidenceItems,
+section deltas, complete) through two paths:
+
+  legacy      model_dump walk + json.dumps of the broker message, json.dumps
+              again per connected reader, and the whole thoughts list
+              re-encoded on every thought for the polling fallback
+  single-pass encode_json once per event; the bytes are framed once and shared
+              by every reader, and thoughts persist by joining encoded items
+
+Usage:
+    python -m benchmarks.bench_stream_serialization --jobs 200 --readers 3 --thoughts 80 --evidence 16
+"""
+import argparse
+import json
+import time
+
+from app.schemas.models import EvidenceItem, Plan, Task
+from app.services.stream_service import encode_json, encode_json_array, sse_frame
+
+
+def _plan(tasks: int) -> Plan:
+    return Plan(
+        blog_title="Scaling Event Streams for Long-Running Generation Jobs",
+        reasoning="Readers need the mechanics first, then trade-offs, then an operational checklist. " * 3,
+        audience="Backend engineers running async job pipelines",
+        tone="practical, crisp",
+        blog_kind="system_design",
+        constraints=["Cite benchmarks", "Include one diagram", "Avoid vendor lock-in"],
+        tasks=[
+            Task(
+                id=i,
+                title=f"Section {i}: delivery guarantees and back-pressure",
+                goal="Explain how the stream stays bounded while slow readers catch up.",
+                bullets=[f"Point {j} about buffering, replay and fan-out costs" for j in range(5)],
+                target_words=300,
+                tags=["streaming", "sse", "performance"],
+                requires_research=i % 2 == 0,
+                requires_citation=i % 3 == 0,
+            )
+            for i in range(1, tasks + 1)
+        ],
+    )
+
+
+def _evidence(count: int) -> list:
+    return [
+        EvidenceItem(
+            title=f"Benchmarking server-sent events at scale, part {i}",
+            url=f"https://example.com/articles/sse-scale-{i}",
+            published_at=f"2025-{(i % 12) + 1:02d}-15",
+            snippet="Measured throughput and tail latency for SSE fan-out under load with varying reader counts. " * 4,
+            source="example.com",
+        )
+        for i in range(count)
+    ]
+
+
+def _events(thoughts: int, tasks: int, evidence: int) -> list:
+    plan = _plan(tasks)
+    items = _evidence(evidence)
+    events = [("thought", f"Step {i}: evaluating research coverage for section {i % tasks}.") for i in range(thoughts)]
+    events.insert(5, ("plan", plan))
+    events.insert(10, ("evidence", items))
+    events += [("section_delta", {"task_id": i % tasks, "delta": "token " * 8}) for i in range(200)]
+    events.append(("complete", {"plan": plan, "evidence": items, "final": "# Title\n\n" + "Body text. " * 2000}))
+    return events
+
+
+def _make_serializable(obj):
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if isinstance(obj, list):
+        return [_make_serializable(item) for item in obj]
+    if isinstance(obj, dict):
+        return {k: _make_serializable(v) for k, v in obj.items()}
+    return obj
+
+
+def _legacy(events: list, readers: int) -> int:
+    written = 0
+    thoughts = []
+    for event, data in events:
+        message = {"event": event, "data": _make_serializable(data)}
+        written += len(json.dumps(message))
+        for _ in range(readers):
+            written += len(f"event: {event}\ndata: {json.dumps(message['data'])}\n\n")
+        if event == "thought":
+            thoughts.append(data)
+            written += len(json.dumps(thoughts))
+    return written
+
+
+def _single_pass(events: list, readers: int) -> int:
+    written = 0
+    thoughts = []
+    for entry_id, (event, data) in enumerate(events, 1):
+        payload = encode_json(data)
+        frame = sse_frame(event, payload, str(entry_id))
+        written += len(payload) + len(frame) * readers
+        if event == "thought":
+            thoughts.append(payload)
+            written += len(encode_json_array(thoughts))
+    return written
+
+
+def _time(fn, events: list, readers: int, jobs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(jobs):
+        fn(events, readers)
+    return (time.perf_counter() - start) / jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=200, help="Simulated jobs per path.")
+    parser.add_argument("--readers", type=int, default=3, help="Connected SSE readers per job.")
+    parser.add_argument("--thoughts", type=int, default=80, help="Thought events per job.")
+    parser.add_argument("--tasks", type=int, default=8, help="Plan sections.")
+    parser.add_argument("--evidence", type=int, default=16, help="Evidence items.")
+    args = parser.parse_args()
+
+    events = _events(args.thoughts, args.tasks, args.evidence)
+    # Warm up both paths before timing
+    _legacy(events, args.readers)
+    _single_pass(events, args.readers)
+
+    legacy = _time(_legacy, events, args.readers, args.jobs)
+    single = _time(_single_pass, events, args.readers, args.jobs)
+    plan, evidence = events[5][1], events[10][1]
+    print(f"jobs={args.jobs} events/job={len(events)} readers={args.readers} thoughts={args.thoughts} "
+          f"tasks={args.tasks} evidence={args.evidence}")
+    print(f"payload bytes   plan={len(encode_json(plan))} evidence={len(encode_json(evidence))}")
+    print(f"legacy          {legacy * 1000:8.3f} ms/job")
+    print(f"single-pass     {single * 1000:8.3f} ms/job")
+    print(f"speedup         {legacy / single:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measures the per-job workflow setup cost before the first LLM token is requested.
+
+Compares building the graph on every job (create_workflow) against the
+process-wide registry (get_workflow). No network calls are made.
+
+Usage:
+    python -m benchmarks.bench_workflow_setup --jobs 50
+"""
+import argparse
+import os
+import time
+
+# Nodes construct their LLM clients eagerly; a placeholder key is enough for setup.
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-placeholder")
+
+from app.graph.workflow import create_workflow, get_workflow, clear_workflow_cache
+
+
+def _time_per_job(build, jobs: int) -> list:
+    timings = []
+    for _ in range(jobs):
+        start = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _report(label: str, timings: list):
+    ordered = sorted(timings)
+    mean_ms = sum(ordered) / len(ordered) * 1000
+    p50_ms = ordered[len(ordered) // 2] * 1000
+    p95_ms = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+    print(f"{label:<28} mean={mean_ms:8.3f} ms  p50={p50_ms:8.3f} ms  p95={p95_ms:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=50, help="Number of simulated jobs per variant.")
+    args = parser.parse_args()
+
+    _report("before: create_workflow()", _time_per_job(create_workflow, args.jobs))
+
+    clear_workflow_cache()
+    cold_start = time.perf_counter()
+    get_workflow()
+    print(f"{'after: first get_workflow()':<28} {(time.perf_counter() - cold_start) * 1000:8.3f} ms (one-off per process)")
+    _report("after: get_workflow()", _time_per_job(get_workflow, args.jobs))
+
+
+if __name__ == "__main__":
+    main()
@@ -80,6 +80,13 @@ export function BlogGenerator({ initialJobId, onReset, onNavigateToProfile, onRe
   const [isThinkingOpen, setIsThinkingOpen] = useState(true);
   const [streamingContent, setStreamingContent] = useState("");
   const thoughtsEndRef = useRef<HTMLDivElement>(null);
+  // Per-section drafts (task id -> text) built from section_delta events. Sections already
+  // released into the merged draft (section_appended) are rendered from mergedContentRef instead.
+  const sectionDraftsRef = useRef<Record<number, string>>({});
+  const appendedSectionsRef = useRef<Set<number>>(new Set());
+  const mergedContentRef = useRef("");
+  // Version of mergedContentRef; `content` events are deltas against the previous version
+  const contentVersionRef = useRef(0);
 
   // Editor State
   const [isEditing, setIsEditing] = useState(false);
@@ -147,6 +154,10 @@ export function BlogGenerator({ initialJobId, onReset, onNavigateToProfile, onRe
     setStatus(null);
     setThoughts([]);
     setStreamingContent("");
+    sectionDraftsRef.current = {};
+    appendedSectionsRef.current = new Set();
+    mergedContentRef.current = "";
+    contentVersionRef.current = 0;
     
     try {
       const res = await axios.post(`${apiUrl}/api/v1/generate`, { topic, tone });
@@ -192,8 +203,16 @@ export function BlogGenerator({ initialJobId, onReset, onNavigateToProfile, onRe
     });
 
     eventSource.addEventListener("error", (event) => {
+        // Dropped connection: the browser reconnects with Last-Event-ID and the server replays what was missed
+        if (!(event as MessageEvent).data && eventSource.readyState === EventSource.CONNECTING) {
+            console.warn("SSE connection dropped, reconnecting...");
+            return;
+        }
+        // Server-reported error or a stream that cannot be resumed: stop the browser retrying it and poll instead
         console.error("SSE Stream Error:", event);
         clearTimeout(fallbackTimer);
+        eventSource.close();
+        if (eventSourceRef.current === eventSource) eventSourceRef.current = null;
         if (!fallbackTriggered) {
             fallbackTriggered = true;
             pollStatus(id);
@@ -236,11 +255,55 @@ export function BlogGenerator({ initialJobId, onReset, onNavigateToProfile, onRe
         } catch (e) {}
     });
 
+    // Merged prefix followed by the live drafts of sections that are still being written
+    const renderLiveDraft = () => {
+        const drafts = sectionDraftsRef.current;
+        const pending = Object.keys(drafts)
+            .map(Number)
+            .filter((taskId) => !appendedSectionsRef.current.has(taskId))
+            .sort((a, b) => a - b)
+            .map((taskId) => drafts[taskId]);
+        return [mergedContentRef.current, ...pending].filter(Boolean).join("\n\n");
+    };
+
+    eventSource.addEventListener("section_delta", (event) => {
+        clearTimeout(fallbackTimer);
+        try {
+            const data = JSON.parse(event.data);
+            const drafts = sectionDraftsRef.current;
+            drafts[data.task_id] = (drafts[data.task_id] || "") + data.delta;
+            setStreamingContent(renderLiveDraft());
+        } catch (e) {}
+    });
+
+    eventSource.addEventListener("section_appended", (event) => {
+        try {
+            const data = JSON.parse(event.data);
+            appendedSectionsRef.current.add(data.task_id);
+        } catch (e) {}
+    });
+
+    // Full document on connect/resync ("snapshot"), otherwise a splice against the previous version
     eventSource.addEventListener("content", (event) => {
         try {
             const data = JSON.parse(event.data);
-            setStreamingContent(data);
-            setContent(data); // Sync editor
+            if (data.op !== "snapshot") {
+                if (data.version <= contentVersionRef.current) return; // replayed delta we already applied
+                if (data.base !== contentVersionRef.current) {
+                    console.warn("Content delta out of order. Falling back to polling...");
+                    eventSource.close();
+                    pollStatus(id);
+                    return;
+                }
+            }
+            const current = mergedContentRef.current;
+            const next = data.op === "snapshot"
+                ? data.text
+                : current.slice(0, data.at) + data.text + current.slice(data.at + data.remove);
+            contentVersionRef.current = data.version;
+            mergedContentRef.current = next;
+            setStreamingContent(renderLiveDraft());
+            setContent(next); // Sync editor
         } catch (e) {}
     });
 
@@ -269,17 +332,17 @@ export function BlogGenerator({ initialJobId, onReset, onNavigateToProfile, onRe
         } catch (e) {}
     });
 
+    // The server could not replay everything since our last event. A content snapshot follows;
+    // live section drafts may have missed deltas, so drop them until their sections are appended.
+    eventSource.addEventListener("resync", () => {
+        sectionDraftsRef.current = {};
+    });
+
     eventSource.addEventListener("end", () => {
         eventSource.close();
         // Fallback: poll once to ensure consistent state
         pollStatus(id); 
     });
-
-    eventSource.onerror = () => {
-        eventSource.close();
-        // Fallback to polling if stream fails
-        pollStatus(id);
-    };
   };
 
   const pollStatus = async (id: string) => {
@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Point every store at throwaway files before any app module reads its configuration
+_tmp = tempfile.mkdtemp(prefix="scribeflow-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["CACHE_DB_PATH"] = os.path.join(_tmp, "cache.db")
+os.environ["STREAM_BROKER_URL"] = "memory://"
+os.environ.setdefault("SECRET_KEY", "test-secret")
@@ -0,0 +1,72 @@
+import pytest
+from app.services import cache_service
+from app.services.cache_service import SQLiteCache
+
+
+class _Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache_service.time, "time", clock)
+    return clock
+
+
+def test_round_trip_and_miss(tmp_path):
+    cache = SQLiteCache("t", ttl_seconds=60, max_entries=10, path=str(tmp_path / "c.db"))
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = SQLiteCache("t", ttl_seconds=60, max_entries=10, path=str(tmp_path / "c.db"))
+    cache.set("k", "v")
+    cache.set("short", "v", ttl_seconds=5)
+    clock.now += 30
+    assert cache.get("k") == "v"
+    assert cache.get("short") is None
+    clock.now += 31
+    assert cache.get("k") is None
+
+
+def test_max_age_narrows_freshness(tmp_path, clock):
+    cache = SQLiteCache("t", ttl_seconds=3600, max_entries=10, path=str(tmp_path / "c.db"))
+    cache.set("k", "v")
+    clock.now += 120
+    assert cache.get("k", max_age_seconds=60) is None
+    assert cache.get("k", max_age_seconds=300) == "v"
+
+
+def test_eviction_keeps_newest_entries(tmp_path, clock):
+    cache = SQLiteCache("t", ttl_seconds=3600, max_entries=10, path=str(tmp_path / "c.db"))
+    for i in range(cache_service._EVICTION_CHECK_INTERVAL):
+        clock.now += 1
+        cache.set(f"k{i}", str(i))
+    newest = cache_service._EVICTION_CHECK_INTERVAL - 1
+    assert cache.get(f"k{newest}") == str(newest)
+    assert cache.get(f"k{newest - 9}") is not None
+    assert cache.get(f"k{newest - 10}") is None
+    assert cache.evictions == cache_service._EVICTION_CHECK_INTERVAL - 10
+
+
+def test_eviction_drops_expired_entries_first(tmp_path, clock):
+    cache = SQLiteCache("t", ttl_seconds=3600, max_entries=1000, path=str(tmp_path / "c.db"))
+    cache.set("stale", "v", ttl_seconds=1)
+    clock.now += 10
+    for i in range(cache_service._EVICTION_CHECK_INTERVAL - 1):
+        cache.set(f"k{i}", "v")
+    assert cache.evictions == 1
+
+
+def test_namespaces_do_not_share_entries(tmp_path):
+    path = str(tmp_path / "c.db")
+    SQLiteCache("a", ttl_seconds=60, max_entries=10, path=path).set("k", "from a")
+    assert SQLiteCache("b", ttl_seconds=60, max_entries=10, path=path).get("k") is None
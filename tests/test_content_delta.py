@@ -0,0 +1,53 @@
+import asyncio
+import orjson
+import pytest
+from app.services.stream_service import MemoryBroker, StreamManager, content_delta
+
+
+def _apply(doc: str, delta: dict) -> str:
+    return doc[:delta["at"]] + delta["text"] + doc[delta["at"] + delta["remove"]:]
+
+
+@pytest.mark.parametrize("old,new", [
+    ("", "# Title\n"),
+    ("# Title\n", "# Title\n\nFirst section."),
+    ("# Title\n\nDraft text.", "# Title\n\nFinal text."),
+    ("abcabc", "abc"),
+    ("same", "same"),
+    ("prefix and suffix", "prefix, middle and suffix"),
+])
+def test_content_delta_reconstructs_the_new_document(old, new):
+    assert _apply(old, content_delta(old, new)) == new
+
+
+def test_growing_draft_is_a_pure_append():
+    assert content_delta("# T\n", "# T\n\nmore") == {"at": 4, "remove": 0, "text": "\nmore"}
+
+
+def test_pushes_are_versioned_deltas_and_new_readers_start_from_a_snapshot():
+    async def scenario():
+        manager = StreamManager(MemoryBroker())
+        await manager.create("j")
+        first = orjson.loads(await manager.push("j", "content", "# T\n"))
+        second = orjson.loads(await manager.push("j", "content", "# T\n\nbody"))
+        assert await manager.push("j", "content", "# T\n\nbody") is None  # unchanged
+        third = orjson.loads(await manager.push("j", "content", "# T\n\nBODY"))
+        assert [(d["op"], d["version"], d["base"]) for d in (first, second, third)] == [
+            ("append", 1, 0), ("append", 2, 1), ("patch", 3, 2),
+        ]
+        doc = ""
+        for delta in (first, second, third):
+            doc = _apply(doc, delta)
+        assert doc == "# T\n\nBODY"
+
+        await manager.push("j", "end", {"status": "completed"})
+        frames = []
+        async for frame in manager.events("j"):
+            frames.append(frame)
+            if frame.event == "end":
+                break
+        snapshot = orjson.loads(frames[0].payload)
+        assert (frames[0].event, snapshot["op"], snapshot["version"], snapshot["text"]) == ("content", "snapshot", 3, "# T\n\nBODY")
+        # Deltas already folded into the snapshot are not replayed
+        assert [f.event for f in frames[1:]] == ["end"]
+    asyncio.run(scenario())
@@ -0,0 +1,47 @@
+from app.utils.evidence import pack_results
+from app.utils.relevance import BM25Index
+from app.utils.tokens import estimate_tokens
+
+
+def _result(title: str, url: str, snippet: str = "", published_at: str = None) -> dict:
+    return {"title": title, "url": url, "snippet": snippet, "published_at": published_at}
+
+
+def test_pack_results_dedupes_urls_and_interleaves_by_rank():
+    text, tokens = pack_results([
+        [_result("A1", "https://a.com/1"), _result("A2", "https://a.com/2")],
+        [_result("B1", "http://www.a.com/1/?utm_source=x"), _result("B2", "https://b.com/2", published_at="2025-01-02")],
+    ])
+    headers = [line for line in text.splitlines() if line.startswith("[")]
+    assert headers == [
+        "[1] A1 | https://a.com/1",
+        "[2] A2 | https://a.com/2",
+        "[3] B2 | https://b.com/2 | 2025-01-02",
+    ]
+    assert tokens == estimate_tokens(text)
+
+
+def test_pack_results_stays_within_budget_and_favours_top_ranks():
+    words = " ".join(f"word{i}" for i in range(400))
+    results = [[_result(f"T{i}", f"https://site{i}.com/post", words) for i in range(10)]]
+    text, tokens = pack_results(results, token_budget=300, max_snippet_chars=2000)
+    assert tokens <= 300
+    blocks = text.split("\n[")
+    assert len(blocks[0]) > len(blocks[-1])
+    assert blocks[0].rstrip().endswith("…")
+
+
+def test_pack_results_handles_empty_input():
+    assert pack_results([]) == ("", 0)
+    assert pack_results([[], []]) == ("", 0)
+
+
+def test_bm25_ranks_matching_documents_first():
+    index = BM25Index([
+        "Gardening tips for spring",
+        "Rust async runtimes compared: tokio and async-std",
+        "Async programming in Rust with tokio",
+    ])
+    assert index.top_k("rust tokio runtime", 3)[0] in (1, 2)
+    assert 0 not in index.top_k("rust tokio", 3)
+    assert index.scores("unrelated") == [0.0, 0.0, 0.0]
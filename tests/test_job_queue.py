@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timedelta
+import orjson
+import pytest
+from sqlmodel import Session, delete, select
+from app.database import engine, create_db_and_tables
+from app.schemas.db_models import Blog, User
+from app.services import job_queue
+from app.services.stream_service import MemoryBroker, StreamManager
+
+
+@pytest.fixture
+def queue():
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.exec(delete(Blog))
+        user = User(email=f"queue-{datetime.utcnow().timestamp()}@example.com")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        user_id = user.id
+
+    def enqueue(job_id: str, age_seconds: float = 0, **fields):
+        with Session(engine) as session:
+            session.add(Blog(job_id=job_id, user_id=user_id, topic=f"topic {job_id}", status="queued",
+                             created_at=datetime.utcnow() - timedelta(seconds=age_seconds), **fields))
+            session.commit()
+    return enqueue
+
+
+def _blog(job_id: str) -> Blog:
+    with Session(engine) as session:
+        return session.exec(select(Blog).where(Blog.job_id == job_id)).first()
+
+
+def _expire_lease(job_id: str):
+    with Session(engine) as session:
+        blog = session.get(Blog, _blog(job_id).id)
+        blog.claimed_at = datetime.utcnow() - timedelta(seconds=job_queue.JOB_LEASE_SECONDS + 1)
+        session.add(blog)
+        session.commit()
+
+
+def test_claims_oldest_queued_job_once(queue):
+    queue("new", age_seconds=1)
+    queue("old", age_seconds=10)
+    assert job_queue.claim_job("w1") == ("old", "topic old", "Professional", 1)
+    assert job_queue.claim_job("w2")[0] == "new"
+    assert job_queue.claim_job("w3") is None
+    blog = _blog("old")
+    assert (blog.status, blog.worker_id, blog.attempts) == ("processing", "w1", 1)
+
+
+def test_only_the_lease_holder_renews(queue):
+    queue("j")
+    job_queue.claim_job("w1")
+    assert job_queue.renew_lease("j", "w1")
+    assert not job_queue.renew_lease("j", "w2")
+
+
+def test_expired_lease_is_reclaimed_with_another_attempt(queue):
+    queue("j")
+    job_queue.claim_job("w1")
+    assert job_queue.claim_job("w2") is None
+    _expire_lease("j")
+    assert job_queue.claim_job("w2") == ("j", "topic j", "Professional", 2)
+    assert not job_queue.renew_lease("j", "w1")
+
+
+def test_release_requeues_without_spending_an_attempt(queue):
+    queue("j")
+    job_queue.claim_job("w1")
+    assert job_queue.release_job("j", "w1")
+    blog = _blog("j")
+    assert (blog.status, blog.worker_id, blog.attempts) == ("queued", None, 0)
+    assert not job_queue.release_job("j", "w1")
+
+
+def test_exhausted_jobs_are_failed_not_reclaimed(queue):
+    queue("j", attempts=job_queue.JOB_MAX_ATTEMPTS - 1)
+    job_queue.claim_job("w1")
+    _expire_lease("j")
+    assert job_queue.claim_job("w2") is None
+    assert job_queue.fail_exhausted_jobs() == ["j"]
+    assert _blog("j").status == "failed"
+
+
+def test_preferred_jobs_first_and_others_only_after_waiting(queue):
+    queue("foreign-new")
+    queue("foreign-old", age_seconds=60)
+    queue("mine")
+    assert job_queue.claim_job("w", prefer=["mine"], others_after=5)[0] == "mine"
+    assert job_queue.claim_job("w", prefer=[], others_after=5)[0] == "foreign-old"
+    assert job_queue.claim_job("w", prefer=[], others_after=5) is None
+    assert job_queue.claim_job("w")[0] == "foreign-new"
+
+
+def test_queue_stats_counts_queued_and_processing(queue):
+    queue("a")
+    queue("b")
+    job_queue.claim_job("w")
+    stats = job_queue.queue_stats()
+    assert (stats["queued"], stats["processing"]) == (1, 1)
+
+
+def test_reclaimed_stream_continues_content_versions():
+    async def scenario():
+        broker = MemoryBroker()
+        first = StreamManager(broker)
+        await first.announce("j")
+        assert first.lifecycle.announced() == ["j"]
+        await first.create("j")
+        assert first.lifecycle.announced() == []
+        await first.push("j", "content", "# T\n\nold")
+
+        # Another worker on the same broker reclaims the job after the first one died
+        second = StreamManager(broker)
+        await second.create("j")
+        delta = orjson.loads(await second.push("j", "content", "# T\n\nnew"))
+        assert (delta["op"], delta["version"], delta["base"]) == ("patch", 2, 1)
+        events = [event for _, event, _ in await broker.read("j", None, timeout=0)]
+        assert events == ["content", "resync", "content"]
+    asyncio.run(scenario())
+
+
+def test_memory_stream_is_served_only_once_claimed_here_or_ended():
+    async def scenario():
+        manager = StreamManager(MemoryBroker())
+        await manager.announce("j")
+        assert not await manager._wait_for_claim("j", grace=0.05)
+        # A queued job cancelled before any claim still delivers its `end`
+        await manager.push("j", "end", {"status": "cancelled"})
+        assert await manager._wait_for_claim("j", grace=0)
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+from app.utils.queries import normalize_query, plan_queries
+
+
+def test_normalize_query_folds_case_and_whitespace():
+    assert normalize_query("  Rust   ASYNC\tRuntimes \n") == "rust async runtimes"
+    assert normalize_query("") == ""
+    assert normalize_query(None) == ""
+
+
+def test_normalize_query_keeps_meaningful_symbols():
+    keys = {normalize_query(q) for q in ("C++ memory model", "C# memory model", "C memory model")}
+    assert len(keys) == 3
+    assert normalize_query("Node.js streams") == "node.js streams"
+
+
+def test_plan_queries_drops_blank_and_near_duplicate_queries():
+    kept, saved = plan_queries([
+        "Rust async runtimes 2025",
+        "  rust   ASYNC runtimes 2025 ",
+        "",
+        "async runtimes in Rust 2025",
+        "Go scheduler internals",
+    ])
+    assert kept == ["Rust async runtimes 2025", "Go scheduler internals"]
+    assert saved == 3
+
+
+def test_plan_queries_keeps_queries_that_differ_by_symbols():
+    queries = [
+        "C++ memory model 2025",
+        "C memory model 2025",
+        "C# memory model 2025",
+        "python 3.11 performance changes explained in depth",
+        "python 3.12 performance changes explained in depth",
+    ]
+    kept, saved = plan_queries(queries, max_queries=10)
+    assert kept == queries
+    assert saved == 0
+
+
+def test_plan_queries_keeps_router_order_and_caps():
+    kept, saved = plan_queries([f"topic {i} unique words {i * 7}" for i in range(8)], max_queries=3)
+    assert kept == ["topic 0 unique words 0", "topic 1 unique words 7", "topic 2 unique words 14"]
+    assert saved == 5
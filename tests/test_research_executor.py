@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from app.services import research_service
+from app.services.research_service import ResearchExecutor
+
+
+def _run(executor: ResearchExecutor, queries):
+    return asyncio.run(executor.run(queries))
+
+
+def _counter(name: str) -> int:
+    return research_service._counters[name]
+
+
+@pytest.fixture
+def no_hedge(monkeypatch):
+    monkeypatch.setattr(research_service, "hedge_after", lambda query_timeout: None)
+
+
+def test_results_keep_query_order_and_failures_are_empty(no_hedge):
+    async def search(query):
+        await asyncio.sleep(0.02 if query == "a" else 0.001)
+        if query == "boom":
+            raise RuntimeError("provider error")
+        return [{"q": query}]
+
+    results = _run(ResearchExecutor(search, deadline=2, concurrency=2, query_timeout=1), ["a", "boom", "c"])
+    assert results == [[{"q": "a"}], [], [{"q": "c"}]]
+
+
+def test_slow_query_times_out(no_hedge):
+    async def search(query):
+        await asyncio.sleep(1 if query == "slow" else 0)
+        return [{"q": query}]
+
+    timeouts = _counter("timeouts")
+    results = _run(ResearchExecutor(search, deadline=2, concurrency=2, query_timeout=0.05), ["slow", "fast"])
+    assert results == [[], [{"q": "fast"}]]
+    assert _counter("timeouts") == timeouts + 1
+
+
+def test_deadline_returns_partial_results(no_hedge):
+    async def search(query):
+        await asyncio.sleep(0.001 if query == "fast" else 1)
+        return [{"q": query}]
+
+    skipped = _counter("skipped")
+    results = _run(ResearchExecutor(search, deadline=0.1, concurrency=1, query_timeout=5), ["fast", "slow", "queued"])
+    assert results == [[{"q": "fast"}], [], []]
+    assert _counter("skipped") == skipped + 2
+
+
+def test_hedge_wins_when_primary_is_slow(monkeypatch):
+    monkeypatch.setattr(research_service, "hedge_after", lambda query_timeout: 0.02)
+    calls = []
+
+    async def search(query):
+        calls.append(query)
+        await asyncio.sleep(1 if len(calls) == 1 else 0.001)
+        return [{"attempt": len(calls)}]
+
+    wins = _counter("hedge_wins")
+    results = _run(ResearchExecutor(search, deadline=2, concurrency=2, query_timeout=0.5), ["q"])
+    assert results == [[{"attempt": 2}]]
+    assert _counter("hedge_wins") == wins + 1
+
+
+def test_hedges_never_exceed_concurrency(monkeypatch):
+    monkeypatch.setattr(research_service, "hedge_after", lambda query_timeout: 0.01)
+    in_flight = peak = 0
+
+    async def search(query):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(0.05)
+            return [{"q": query}]
+        finally:
+            in_flight -= 1
+
+    results = _run(ResearchExecutor(search, deadline=2, concurrency=2, query_timeout=1), [f"q{i}" for i in range(6)])
+    assert all(results)
+    assert peak <= 2
@@ -0,0 +1,89 @@
+import asyncio
+import orjson
+from app.services.stream_service import MemoryBroker, StreamManager
+
+
+async def _collect(manager: StreamManager, job_id: str, last_event_id: str = None):
+    frames = []
+    async for frame in manager.events(job_id, last_event_id):
+        frames.append(frame)
+        if frame.event in ("end", "error"):
+            break
+    return frames
+
+
+async def _entries(broker: MemoryBroker, job_id: str):
+    return [(event, orjson.loads(payload)) for _, event, payload in await broker.read(job_id, None, timeout=0)]
+
+
+def test_memory_broker_replays_after_cursor_and_tracks_lost_entries():
+    async def scenario():
+        broker = MemoryBroker()
+        assert await broker.publish("j", "thought", b'"x"') is None
+        await broker.open("j")
+        ids = [await broker.publish("j", "thought", f'"{i}"'.encode()) for i in range(5)]
+        assert ids == ["1", "2", "3", "4", "5"]
+        assert [e[0] for e in await broker.read("j", "3", timeout=0)] == ["4", "5"]
+        assert await broker.read("j", "5", timeout=0) == []
+
+        await broker.delete("j", ["1"], lossy=False)
+        assert not await broker.missed("j", None)
+        await broker.delete("j", ["2", "3"], lossy=True)
+        assert await broker.missed("j", "1")
+        assert not await broker.missed("j", "3")
+        assert [e[0] for e in await broker.read("j", None, timeout=0)] == ["4", "5"]
+
+        await broker.discard("j")
+        assert not await broker.exists("j")
+    asyncio.run(scenario())
+
+
+def test_reconnect_replays_exactly_what_was_missed():
+    async def scenario():
+        manager = StreamManager(MemoryBroker())
+        await manager.create("j")
+        for i in range(4):
+            await manager.push("j", "thought", f"step {i}")
+        await manager.push("j", "end", {"status": "completed"})
+        frames = await _collect(manager, "j", "2")
+        assert [(f.entry_id, f.event) for f in frames] == [("3", "thought"), ("4", "thought"), ("5", "end")]
+    asyncio.run(scenario())
+
+
+def test_snapshot_events_and_thoughts_are_coalesced():
+    async def scenario():
+        manager = StreamManager(MemoryBroker(), max_thoughts=2)
+        await manager.create("j")
+        await manager.push("j", "plan", {"v": 1})
+        await manager.push("j", "plan", {"v": 2})
+        for i in range(4):
+            await manager.push("j", "thought", f"t{i}")
+        await manager.push("j", "section_delta", {"task_id": 1, "delta": "a"})
+        await manager.push("j", "section_delta", {"task_id": 2, "delta": "b"})
+        await manager.push("j", "section_appended", {"task_id": 1, "markdown": "a"})
+        assert await _entries(manager.broker, "j") == [
+            ("plan", {"v": 2}),
+            ("thought", "t2"),
+            ("thought", "t3"),
+            ("section_delta", {"task_id": 2, "delta": "b"}),
+            ("section_appended", {"task_id": 1, "markdown": "a"}),
+        ]
+        # Superseded entries leave no gap: replay from the start is still complete
+        assert not await manager.broker.missed("j", None)
+    asyncio.run(scenario())
+
+
+def test_overflow_evicts_low_value_events_and_asks_for_resync():
+    async def scenario():
+        manager = StreamManager(MemoryBroker(), buffer_size=3, max_thoughts=100)
+        await manager.create("j")
+        await manager.push("j", "plan", {"v": 1})
+        for i in range(5):
+            await manager.push("j", "thought", f"t{i}")
+        await manager.push("j", "end", {"status": "completed"})
+        assert [event for event, _ in await _entries(manager.broker, "j")] == ["plan", "thought", "end"]
+
+        frames = await _collect(manager, "j", "2")
+        assert frames[0].event == "resync"
+        assert [f.event for f in frames[1:]] == ["thought", "end"]
+    asyncio.run(scenario())
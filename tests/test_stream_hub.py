@@ -0,0 +1,40 @@
+import asyncio
+from app.services.stream_service import MemoryBroker, StreamHub, StreamManager
+
+
+async def _read_all(manager: StreamManager, job_id: str, last_event_id: str = None):
+    # The stream ends by itself after `end`, as it does for SSE clients
+    return [(frame.entry_id, frame.event) async for frame in manager.events(job_id, last_event_id)]
+
+
+def test_viewers_share_one_feed_and_see_the_same_events():
+    async def scenario():
+        manager = StreamManager(MemoryBroker())
+        await manager.create("j")
+        await manager.push("j", "thought", "before")
+        viewers = [asyncio.create_task(_read_all(manager, "j")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert manager.hub.stats()["per_job_subscribers"] == {"j": 3}
+        assert manager.hub.stats()["watched_jobs"] == 1
+        await manager.push("j", "thought", "live")
+        await manager.push("j", "end", {"status": "completed"})
+        results = await asyncio.gather(*viewers)
+        assert results[0] == [("1", "thought"), ("2", "thought"), ("3", "end")]
+        assert results[1] == results[0] and results[2] == results[0]
+        # The feed is dropped once its last subscriber leaves
+        assert manager.hub.stats()["watched_jobs"] == 0
+    asyncio.run(scenario())
+
+
+def test_subscriber_behind_the_window_catches_up_from_the_broker():
+    async def scenario():
+        broker = MemoryBroker()
+        manager = StreamManager(broker)
+        manager.hub = StreamHub(broker, window=2)
+        await manager.create("j")
+        for i in range(6):
+            await manager.push("j", "thought", f"t{i}")
+        await manager.push("j", "end", {"status": "completed"})
+        frames = await _read_all(manager, "j", "1")
+        assert [entry_id for entry_id, _ in frames] == ["2", "3", "4", "5", "6", "7"]
+    asyncio.run(scenario())